@@ -0,0 +1,101 @@
+#!/bin/python2
+
+# Measures the time needed to parse ability descriptions, comparing the current Ability parser with uncompiled
+# patterns and no pre-check.
+# The corpus consists of typical action texts. Saved D&D Beyond pages can be given to use all of their abilities
+# instead.
+#
+# Usage: benchmarks/abilities.py [-n REPEAT] [page.html ...]
+
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from creature import Ability
+from ddbhelper import DDBSections, ddbParseStatCard
+from htmlbackend import getBackend
+
+CORPUS = [
+    "Melee Weapon Attack: +4 to hit, reach 5 ft., one target. Hit: 6 (1d6 + 3) piercing damage.",
+    "Melee Weapon Attack: +6 to hit, reach 5 ft., one target. Hit: 11 (2d6 + 4) piercing damage plus 7 (2d6) necrotic damage.",
+    "Melee Weapon Attack: +14 to hit, reach 10 ft., one target. Hit: 19 (2d10 + 8) piercing damage plus 9 (2d8) fire damage.",
+    "Melee Weapon Attack: +5 to hit, reach 5 ft., one creature. Hit: 7 (1d8 + 3) slashing damage, and the target must succeed on a DC 13 Constitution saving throw or be poisoned for 1 minute.",
+    "Ranged Weapon Attack: +4 to hit, range 80/320 ft., one target. Hit: 5 (1d6 + 2) piercing damage.",
+    "Ranged Weapon Attack: +5 to hit, range 150/600 ft., one target. Hit: 7 (1d8 + 3) piercing damage.",
+    "Melee or Ranged Weapon Attack: +5 to hit, reach 5 ft. or range 20/60 ft., one target. Hit: 6 (1d6 + 3) piercing damage.",
+    "The dragon makes three attacks: one with its bite and two with its claws.",
+    "The creature makes two attacks: one with its longsword and one with its shortsword.",
+    "The dragon exhales fire in a 60-foot cone. Each creature in that area must make a DC 21 Dexterity saving throw, taking 63 (18d6) fire damage on a failed save, or half as much damage on a successful one.",
+    "The creature has advantage on an attack roll against a creature if at least one of the creature's allies is within 5 feet of the creature and the ally isn't incapacitated.",
+    "While in sunlight, the creature has disadvantage on attack rolls, as well as on Wisdom (Perception) checks that rely on sight.",
+    "The creature has advantage on saving throws against spells and other magical effects.",
+    "If the dragon fails a saving throw, it can choose to succeed instead.",
+    "The creature can breathe air and water.",
+    "The creature's innate spellcasting ability is Charisma (spell save DC 13). It can innately cast the following spells, requiring no material components.",
+    "The creature adds 2 to its AC against one melee attack that would hit it. To do so, the creature must see the attacker and be wielding a melee weapon.",
+    "The dragon makes a Wisdom (Perception) check.",
+    "The dragon beats its wings. Each creature within 10 feet of the dragon must succeed on a DC 22 Dexterity saving throw or take 15 (2d6 + 8) bludgeoning damage and be knocked prone.",
+    "Each creature of the creature's choice that is within 120 feet of it and aware of it must succeed on a DC 19 Wisdom saving throw or become frightened for 1 minute.",
+]
+
+# The previous parser: the pattern is looked up on every call, and every description is searched
+ATTACK = "(\\w*) Weapon Attack: ([+-]\\d*) to hit, reach (.*?), (.*?)\\. Hit: (\\d*) \\((.*?)\\) (\\w*) damage\\s*(plus (\\d*) \\((.*)\\) (.*) damage)?"
+def parseUncompiled(desc):
+    m = re.search(ATTACK, desc)
+    if desc.startswith("Melee Weapon Attack") or desc.startswith("Ranged Weapon Attack"):
+        re.search("", desc)
+    return m
+
+def parseCurrent(desc):
+    return Ability("", desc)
+
+# Returns the descriptions of all abilities on the given pages
+def loadCorpus(infiles):
+    backend = getBackend()
+    corpus = []
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        for infile in infiles:
+            with open(infile) as fp:
+                document, cards = backend.parse(fp.read())
+            for card in cards:
+                sections = ddbParseStatCard(card)
+                for section in [ DDBSections.SPECIAL_ABILITIES, DDBSections.ACTIONS, DDBSections.LEGENDARY_ACTIONS,
+                                 DDBSections.REACTIONS ]:
+                    corpus.extend([ desc for name, desc in sections[section] ])
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return corpus
+
+# Returns the best time of the given number of runs over the whole corpus
+def measure(parse, corpus, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for desc in corpus:
+            parse(desc)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the time needed to parse ability descriptions.")
+    parser.add_argument("infiles", nargs="*", help="HTML files saved from D&D Beyond to take the abilities from")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    corpus = loadCorpus(args.infiles) if args.infiles else CORPUS * 500
+    attacks = len([ desc for desc in corpus if "Weapon Attack" in desc ])
+    print "Corpus:", len(corpus), "descriptions,", attacks, "weapon attacks"
+
+    for name, parse in [ ("uncompiled", parseUncompiled), ("current", parseCurrent) ]:
+        elapsed = measure(parse, corpus, args.repeat)
+        print "%-12s %8.3f s %10.0f descriptions/s" % (name, elapsed, len(corpus) / elapsed)
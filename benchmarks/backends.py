@@ -0,0 +1,86 @@
+#!/bin/python2
+
+# Compares the throughput and peak memory of the HTML backends on a saved D&D Beyond page.
+# Every backend runs in a fresh process, so the memory used by one backend does not hide the memory used by another.
+#
+# Usage: benchmarks/backends.py [-n REPEAT] page.html
+
+import os
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from creature import Creature
+from htmlbackend import availableBackends, getBackend
+
+# Returns the peak resident set size of this process in MB
+def peakRSS():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+# Parses the page with the given backend and returns the measurements
+def run(args):
+    name, infile, repeat = args
+    backend = getBackend(name)
+
+    with open(infile) as fp:
+        markup = fp.read()
+    rss_before = peakRSS()
+
+    # The parser prints every creature. Silence it, so we measure the parser and not the terminal.
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        tree_time = 0.0
+        parse_time = 0.0
+        for i in range(repeat):
+            start = time.time()
+            document, cards = backend.parse(markup)
+            tree_time += time.time() - start
+
+            start = time.time()
+            creatures = [ Creature.fromDDBStatCard(card, document) for card in cards ]
+            parse_time += time.time() - start
+
+            # Release the trees of this run, so the peak memory is the one of a single run
+            count = len(cards)
+            del document, cards, creatures
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return {
+        "backend"    : name,
+        "cards"      : count,
+        "tree"       : tree_time / repeat,
+        "parse"      : parse_time / repeat,
+        "peak_rss"   : peakRSS(),
+        "rss_growth" : peakRSS() - rss_before,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the HTML backends on a saved D&D Beyond page.")
+    parser.add_argument("infile", help="HTML file saved from D&D Beyond")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="number of times each backend parses the page")
+    args = parser.parse_args()
+
+    size = os.path.getsize(args.infile) / 1024.0 / 1024.0
+    print "Page: %s (%.1f MB)" % (args.infile, size)
+    print "%-12s %6s %10s %10s %10s %10s %12s %12s" % ("Backend", "Cards", "Tree [s]", "Cards [s]",
+                                                     "MB/s", "Cards/s", "Peak [MB]", "Growth [MB]")
+
+    for name in availableBackends():
+        pool = multiprocessing.Pool(1)
+        try:
+            r = pool.apply(run, [(name, args.infile, args.repeat)])
+        finally:
+            pool.close()
+            pool.join()
+
+        total = r["tree"] + r["parse"]
+        print "%-12s %6d %10.3f %10.3f %10.2f %10.1f %12.1f %12.1f" % (r["backend"], r["cards"], r["tree"], r["parse"],
+                                                                   size / total, r["cards"] / total,
+                                                                   r["peak_rss"], r["rss_growth"])
@@ -0,0 +1,193 @@
+#!/bin/python2
+
+# Generates a synthetic D&D Beyond bestiary page with the given number of stat cards (Basic-Text-Frame divs).
+# The cards vary in their stats, and in the number of special abilities, actions, legendary actions and reactions.
+# Some actions span several paragraphs, and the texts use the typographic characters of D&D Beyond. The same seed
+# always generates the same page.
+#
+# Usage: benchmarks/bestiary.py [--seed SEED] [--book BOOK] [-o page.html] COUNT
+
+import sys
+import random
+import argparse
+
+SIZES = [ "Tiny", "Small", "Medium", "Large", "Huge", "Gargantuan" ]
+TYPES = [ "aberration", "beast", "celestial", "construct", "dragon", "elemental", "fey", "fiend", "giant",
+          "humanoid", "monstrosity", "ooze", "plant", "undead" ]
+SUBTYPES = [ "goblinoid", "demon", "devil", "shapechanger", "elf", "titan" ]
+ALIGNMENTS = [ "lawful good", "neutral good", "chaotic good", "lawful neutral", "neutral", "chaotic neutral",
+               "lawful evil", "neutral evil", "chaotic evil", "unaligned", "any alignment" ]
+SPEEDS = [ "30 ft.", "40 ft., climb 30 ft.", "30 ft., fly 60 ft.", "10 ft., swim 40 ft.", "0 ft., fly 30 ft. (hover)" ]
+SENSES = [ "passive Perception 10", "darkvision 60 ft., passive Perception 12", "blindsight 30 ft., passive Perception 9",
+           "truesight 120 ft., passive Perception 22" ]
+LANGUAGES = [ u"\u2014", u"Common", u"Common, Draconic", u"understands Abyssal but can\u2019t speak", u"telepathy 120 ft." ]
+CHALLENGES = [ ["0", "10"], ["1/8", "25"], ["1/4", "50"], ["1/2", "100"], ["1", "200"], ["3", "700"], ["5", "1,800"],
+               ["10", "5,900"], ["13", "10,000"], ["17", "18,000"], ["21", "33,000"] ]
+ABILITIES = [ "STR", "DEX", "CON", "INT", "WIS", "CHA" ]
+
+WEAPONS = [ "Bite", "Claw", "Tail", "Longsword", "Shortbow", "Slam", "Tentacle", "Gore", "Scimitar", "Spear" ]
+DAMAGE_TYPES = [ "piercing", "slashing", "bludgeoning" ]
+EXTRA_DAMAGE_TYPES = [ "fire", "cold", "necrotic", "poison", "acid", "lightning" ]
+
+SPECIAL_ABILITIES = [
+    [u"Pack Tactics", u"The creature has advantage on an attack roll against a creature if at least one of the "
+                     u"creature\u2019s allies is within 5\xa0feet of the creature and the ally isn\u2019t incapacitated."],
+    [u"Sunlight Sensitivity", u"While in sunlight, the creature has disadvantage on attack rolls, as well as on Wisdom "
+                             u"(Perception) checks that rely on sight."],
+    [u"Magic Resistance", u"The creature has advantage on saving throws against spells and other magical effects."],
+    [u"Amphibious", u"The creature can breathe air and water."],
+    [u"Legendary Resistance (3/Day)", u"If the creature fails a saving throw, it can choose to succeed instead."],
+    [u"Keen Smell", u"The creature has advantage on Wisdom (Perception) checks that rely on smell."],
+]
+
+BREATHS = [
+    [u"Fire Breath (Recharge 5\u20136)", u"The creature exhales fire in a 60-foot cone. Each creature in that area must make a "
+                                        u"DC 21 Dexterity saving throw, taking 63 (18d6) fire damage on a failed save, "
+                                        u"or half as much damage on a successful one."],
+    [u"Frightful Presence", u"Each creature of the creature\u2019s choice that is within 120\xa0feet of it and aware of "
+                           u"it must succeed on a DC 19 Wisdom saving throw or become frightened for 1 minute."],
+]
+
+LEGENDARY_ACTIONS = [
+    [u"Detect", u"The creature makes a Wisdom (Perception) check."],
+    [u"Tail Attack", u"The creature makes a tail attack."],
+    [u"Wing Attack (Costs 2 Actions)", u"The creature beats its wings. Each creature within 10\xa0feet of it must "
+                                      u"succeed on a DC 22 Dexterity saving throw or take 15 (2d6 + 8) bludgeoning "
+                                      u"damage and be knocked prone."],
+]
+
+REACTIONS = [
+    [u"Parry", u"The creature adds 2 to its AC against one melee attack that would hit it. To do so, the creature "
+              u"must see the attacker and be wielding a melee weapon."],
+    [u"Unnerving Mask", u"When a creature the creature can see starts its turn within 30\xa0feet of it, the creature "
+                       u"can create the illusion that it looks like one of the creature\u2019s departed loved ones."],
+]
+
+BODY    = "Stat-Block-Styles_Stat-Block-Body"
+HEADING = "Stat-Block-Styles_Stat-Block-Heading"
+SUBHEAD = "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif"
+BOLD    = "Sans-Serif-Character-Styles_Bold-Sans-Serif"
+
+# Returns the markup of a paragraph of the given class that starts with a name
+def namedParagraph(cls, nameclass, name, desc):
+    return u'<p class="%s"><span class="%s">%s.</span> %s</p>' % (cls, nameclass, name, desc)
+
+# Returns the markup of a stat data paragraph
+def dataParagraph(name, value, last=False):
+    cls = "Stat-Block-Styles_Stat-Block-Data-Last" if last else "Stat-Block-Styles_Stat-Block-Data"
+    return u'<p class="%s"><span class="%s">%s</span> %s</p>' % (cls, BOLD, name, value)
+
+# Returns the description of a weapon attack
+def weaponAttack(r):
+    to_hit = r.randint(2, 15)
+    die = r.choice([4, 6, 8, 10, 12])
+    count = r.randint(1, 4)
+    bonus = r.randint(0, 8)
+    average = count * (die+1) // 2 + bonus
+    if r.random() < 0.7:
+        attack = u"<em>Melee Weapon Attack:</em> %+d to hit, reach %d\xa0ft., one target." % (to_hit, r.choice([5, 10, 15]))
+    else:
+        attack = u"<em>Ranged Weapon Attack:</em> %+d to hit, range %d/%d ft., one target." % (to_hit, 80, 320)
+    desc = attack + u" <em>Hit:</em> %d (%dd%d + %d) %s damage" % (average, count, die, bonus, r.choice(DAMAGE_TYPES))
+    if r.random() < 0.4:
+        extra = r.randint(1, 6)
+        desc = desc + u" plus %d (%dd6) %s damage" % (extra * 7 // 2, extra, r.choice(EXTRA_DAMAGE_TYPES))
+    return desc + u"."
+
+# Returns the markup of a single stat card
+def statCard(r, i):
+    name = u"%s %s %d" % (r.choice([u"Elder", u"Young", u"Dire", u"Ancient", u"Giant", u"Shadow"]),
+                          r.choice([u"Wyrm", u"Hound", u"Horror", u"Stalker", u"Knight", u"Ooze"]), i)
+    out = []
+    out.append(u'<div class="Basic-Text-Frame stat-block-background">')
+    if r.random() < 0.5:
+        out.append(u'<a href="https://media.dndbeyond.com/img/monsters/%d.jpeg"><img src="%d.jpeg"/></a>' % (i, i))
+    out.append(u'<p class="Stat-Block-Styles_Stat-Block-Title"><a href="https://www.dndbeyond.com/monsters/%d">%s</a></p>'
+               % (i, name))
+
+    # Stats
+    type = r.choice(TYPES)
+    if r.random() < 0.2:
+        type = type + u" (" + r.choice(SUBTYPES) + u")"
+    out.append(u'<p class="Stat-Block-Styles_Stat-Block-Metadata">%s %s, %s</p>' % (r.choice(SIZES), type, r.choice(ALIGNMENTS)))
+    out.append(dataParagraph("Armor Class", u"%d (natural armor)" % r.randint(10, 22)))
+    dice = r.randint(1, 30)
+    out.append(dataParagraph("Hit Points", u"%d (%dd10 + %d)" % (dice * 11 // 2 + dice, dice, dice)))
+    out.append(dataParagraph("Speed", r.choice(SPEEDS), True))
+
+    out.append(u'<div class="stat-block-ability-scores">')
+    for ability in ABILITIES:
+        score = r.randint(1, 30)
+        out.append(u'<div class="stat-block-ability-scores-stat"><div class="stat-block-ability-scores-heading">%s</div>'
+                   u'<div class="stat-block-ability-scores-data"><span class="stat-block-ability-scores-score">%d</span> '
+                   u'<span class="stat-block-ability-scores-modifier">(%+d)</span></div></div>' % (ability, score, (score-10) // 2))
+    out.append(u'</div>')
+
+    if r.random() < 0.3:
+        out.append(dataParagraph("Damage Immunities", u"fire, poison"))
+    out.append(dataParagraph("Senses", r.choice(SENSES)))
+    out.append(dataParagraph("Languages", r.choice(LANGUAGES)))
+    challenge = r.choice(CHALLENGES)
+    out.append(dataParagraph("Challenge", u"%s (%s XP)" % (challenge[0], challenge[1]), True))
+
+    # Special abilities
+    for name, desc in r.sample(SPECIAL_ABILITIES, r.randint(0, 4)):
+        out.append(namedParagraph(BODY, SUBHEAD, name, desc))
+
+    # Actions
+    out.append(u'<p class="%s">Actions</p>' % HEADING)
+    weapons = r.sample(WEAPONS, r.randint(1, 4))
+    if len(weapons) > 1:
+        out.append(namedParagraph(BODY, SUBHEAD, "Multiattack", u"The creature makes %d attacks." % len(weapons)))
+    for weapon in weapons:
+        out.append(namedParagraph(BODY, SUBHEAD, weapon, weaponAttack(r)))
+    for name, desc in r.sample(BREATHS, r.randint(0, 2)):
+        out.append(namedParagraph(BODY, SUBHEAD, name, desc))
+    if r.random() < 0.1:
+        out.append(namedParagraph(BODY, SUBHEAD, "Eye Rays", u"The creature shoots three of the following magical "
+                                                             u"eye rays at random."))
+        for ray in range(r.randint(2, 10)):
+            out.append(u'<p class="%s"><em>%d. Ray.</em> The targeted creature must succeed on a DC 16 Wisdom saving '
+                       u'throw or take 36 (8d8) necrotic damage.</p>' % (BODY, ray+1))
+
+    # Reactions
+    if r.random() < 0.2:
+        out.append(u'<p class="%s">Reactions</p>' % HEADING)
+        for name, desc in r.sample(REACTIONS, r.randint(1, 2)):
+            out.append(namedParagraph(BODY, SUBHEAD, name, desc))
+
+    # Legendary actions
+    if r.random() < 0.15:
+        out.append(u'<p class="%s">Legendary Actions</p>' % HEADING)
+        out.append(u'<p class="%s">The creature can take 3 legendary actions, choosing from the options below.</p>' % BODY)
+        for name, desc in LEGENDARY_ACTIONS:
+            out.append(namedParagraph("Stat-Block-Styles_Stat-Block-Hanging", BOLD, name, desc))
+
+    out.append(u'</div>')
+    return u"\n".join(out)
+
+# Returns the markup of a D&D Beyond compendium page with the given number of stat cards
+def generateBestiary(count, seed=0, book="Monster Manual"):
+    r = random.Random(seed)
+    out = [ u'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            u'<title>Monsters - %s - Rules - Compendium - D&amp;D Beyond</title></head><body>' % book ]
+    for i in range(count):
+        out.append(u'<p>Lore about the creature, which is not part of its stat card.</p>')
+        out.append(statCard(r, i))
+    out.append(u'</body></html>')
+    return u"\n".join(out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic D&D Beyond bestiary page.")
+    parser.add_argument("count", type=int, help="number of stat cards")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--book", default="Monster Manual", help="name of the source book in the page title")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: standard output)")
+    args = parser.parse_args()
+
+    html = generateBestiary(args.count, args.seed, args.book).encode("utf-8")
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(html)
+    else:
+        sys.stdout.write(html)
@@ -0,0 +1,69 @@
+#!/bin/python2
+
+# Measures the number of creatures per second converted to the GM Forge format, with and without serializing them
+# the way they are written to a compendium pack.
+#
+# Usage: benchmarks/fiveforge.py [-n REPEAT] page.html [page.html ...]
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compendium import MonsterEncoder
+from creature import Creature
+from htmlbackend import getBackend
+
+# Returns the creatures of the given pages
+def loadCreatures(infiles):
+    backend = getBackend()
+    creatures = []
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        for infile in infiles:
+            with open(infile) as fp:
+                document, cards = backend.parse(fp.read())
+            for card in cards:
+                c = Creature.fromDDBStatCard(card, document)
+                if c:
+                    creatures.append(c)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return creatures
+
+# Returns the best time of the given number of runs over all creatures
+def measure(export, creatures, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for c in creatures:
+            export(c)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the conversion of creatures to the GM Forge format.")
+    parser.add_argument("infiles", nargs="+", help="HTML files saved from D&D Beyond")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    creatures = loadCreatures(args.infiles)
+    print "Creatures:", len(creatures)
+
+    exports = [ ("convert", lambda c: c.toFiveForge()) ]
+    for name, encoder in [ ("indent=2", MonsterEncoder()), ("compact", MonsterEncoder(None)),
+                           ("fast", MonsterEncoder(2, True)) ]:
+        if name == "fast" and not MonsterEncoder.available():
+            continue
+        exports.append(("+ " + name, lambda c, encoder=encoder: encoder.dumps(c.toFiveForge())))
+
+    for name, export in exports:
+        elapsed = measure(export, creatures, args.repeat)
+        print "%-12s %8.3f s %10.0f creatures/s" % (name, elapsed, len(creatures) / elapsed)
@@ -0,0 +1,184 @@
+#!/bin/python2
+
+# Measures every stage of the import on synthetic bestiaries of the given sizes, or on saved D&D Beyond pages.
+# The stages are timed separately for every stat card:
+#   tree        building the tree of the card from its markup
+#   stats       walking the card for its stats and the texts of its abilities (ddbParseStatCard)
+#   abilities   parsing the abilities
+#   fiveforge   converting the creature to the GM Forge format
+#   json        serializing the monster into a compendium pack
+# Splitting the page into cards and writing the pack are only timed as a whole.
+# Every page is imported in a fresh process, so the peak memory of one run does not hide the one of another.
+#
+# Usage: benchmarks/importer.py [--cards COUNT ...] [--backend NAME] [--json results.json] [page.html ...]
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bestiary import generateBestiary
+from compendium import MonsterEncoder, MonsterPack
+from creature import Ability, Creature
+from ddbhelper import DDBSections, ddbParseStatCard, ddbStreamStatCards
+from htmlbackend import availableBackends, getBackend
+
+# Stages timed for every card
+STAGES = [ "tree", "stats", "abilities", "fiveforge", "json" ]
+
+# Compendium pack without monsters
+EMPTY_PACK = '{"content": {"Monsters": {"data": []}}}'
+
+# Returns the peak resident set size of this process in MB
+def peakRSS():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+# Returns the given percentile of the sorted list of values
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values)-1, int(len(values) * p / 100.0))]
+
+# Returns the total, p50 and p99 of the given times, in seconds
+def summary(times):
+    times = sorted(times)
+    return { "total" : sum(times), "p50" : percentile(times, 50), "p99" : percentile(times, 99) }
+
+# Imports the page and returns the measurements. The page is either a file, or the number of cards of a
+# synthetic bestiary.
+def run(args):
+    page, backend_name = args
+    backend = getBackend(backend_name)
+
+    if isinstance(page, int):
+        name = "synthetic-" + str(page)
+        data = generateBestiary(page).encode("utf-8")
+    else:
+        name = page
+        with open(page, "rb") as fp:
+            data = fp.read()
+    markup = data.decode("utf-8", "replace")
+    rss_before = peakRSS()
+
+    times = dict([ (stage, []) for stage in STAGES ])
+    totals = []
+    pack = MonsterPack(EMPTY_PACK, MonsterEncoder())
+    failed = 0
+
+    # The parser prints every creature. Silence it, so we measure the parser and not the terminal.
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.time()
+        cards = list(ddbStreamStatCards([markup]))
+        split = time.time() - start
+
+        for document, html in cards:
+            t0 = time.time()
+            card = backend.parseCard(html)
+            t1 = time.time()
+            sections = ddbParseStatCard(card)
+            t2 = time.time()
+            for section in [ DDBSections.SPECIAL_ABILITIES, DDBSections.ACTIONS, DDBSections.LEGENDARY_ACTIONS,
+                             DDBSections.REACTIONS ]:
+                Ability.fromList(sections[section])
+            t3 = time.time()
+
+            # The creature is built from the same card again, outside of the timed stages
+            creature = Creature.fromDDBStatCard(card, document)
+            if not creature:
+                failed += 1
+                continue
+
+            t4 = time.time()
+            monster = creature.toFiveForge()
+            t5 = time.time()
+            pack.upsert(monster)
+            t6 = time.time()
+
+            for stage, elapsed in zip(STAGES, [ t1-t0, t2-t1, t3-t2, t5-t4, t6-t5 ]):
+                times[stage].append(elapsed)
+            totals.append(t3-t0 + t6-t4)
+
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            start = time.time()
+            pack.save(path)
+            write = time.time() - start
+            size = os.path.getsize(path)
+        finally:
+            os.remove(path)
+            pack.close()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    total = split + sum(totals) + write
+    return {
+        "page"          : name,
+        "backend"       : backend.name,
+        "bytes"         : len(data),
+        "cards"         : len(cards),
+        "failed"        : failed,
+        "pack_bytes"    : size,
+        "split"         : split,
+        "write"         : write,
+        "stages"        : dict([ (stage, summary(times[stage])) for stage in STAGES ]),
+        "card"          : summary(totals),
+        "total"         : total,
+        "cards_per_sec" : len(cards) / total if total else None,
+        "peak_rss"      : peakRSS(),
+        "rss_growth"    : peakRSS() - rss_before,
+    }
+
+# Prints the measurements of a run
+def report(r):
+    print "%s: %d cards (%.1f MB), %s, %.1f cards/s, peak RSS %.1f MB (+%.1f MB)" % (
+        r["page"], r["cards"], r["bytes"] / 1024.0 / 1024.0, r["backend"], r["cards_per_sec"] or 0,
+        r["peak_rss"], r["rss_growth"])
+    print "  %-10s %10s %10s %10s" % ("Stage", "Total [s]", "p50 [ms]", "p99 [ms]")
+    for stage in STAGES + [ "card" ]:
+        s = r["stages"][stage] if stage in r["stages"] else r["card"]
+        if s["p50"] is None:
+            continue
+        print "  %-10s %10.3f %10.3f %10.3f" % (stage, s["total"], s["p50"] * 1000, s["p99"] * 1000)
+    print "  %-10s %10.3f" % ("split", r["split"])
+    print "  %-10s %10.3f" % ("write", r["write"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures every stage of the import.")
+    parser.add_argument("infiles", nargs="*", help="HTML files saved from D&D Beyond, imported after the synthetic pages")
+    parser.add_argument("--cards", type=int, nargs="*", default=[ 100, 1000 ],
+                        help="numbers of stat cards of the synthetic bestiaries (default: 100 1000)")
+    parser.add_argument("--backend", choices=availableBackends(), default=None,
+                        help="HTML parser used to build the trees of the cards (default: the fastest installed one)")
+    parser.add_argument("--json", default=None, help="file the results are written to as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for page in args.cards + args.infiles:
+        pool = multiprocessing.Pool(1)
+        try:
+            r = pool.apply(run, [(page, args.backend)])
+        finally:
+            pool.close()
+            pool.join()
+        report(r)
+        results.append(r)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "time"      : time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python"    : platform.python_version(),
+                "platform"  : platform.platform(),
+                "results"   : results,
+            }, f, indent=2, sort_keys=True)
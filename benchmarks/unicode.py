@@ -0,0 +1,97 @@
+#!/bin/python2
+
+# Measures the time needed to replace the typographic characters in descriptions. replaceUnicode is compared with the
+# previous chain of five str.replace calls, with a chain of str.replace calls covering the same characters, and with
+# the single pass without the search for the characters first.
+# Besides the descriptions, the strings the parser passes to replaceUnicode while it parses stat cards are measured,
+# which are mostly short names and stat values. They are taken from the test fixture, or from the given pages.
+#
+# Usage: benchmarks/unicode.py [-n REPEAT] [page.html ...]
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from abilities import CORPUS, measure
+from creature import Creature
+from htmlbackend import getBackend
+import ddbhelper
+from ddbhelper import UNICODE_PATTERN, UNICODE_REPLACEMENTS, replaceUnicode, unicodeReplacement
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "fixtures", "fiveforge.html")
+
+# The previous implementation, which passes over the string once per character
+def replaceChained(str):
+    str = str.replace(u"\u2013", "-")
+    str = str.replace(u"\u2014", "-")
+    str = str.replace(u"\u2019", "'")
+    str = str.replace(u"\u2212", "-")
+    str = str.replace(u"\xa0", " ")
+    return str
+
+# A chain of str.replace calls for all characters replaced by replaceUnicode
+def replaceChainedAll(str):
+    for character, replacement in UNICODE_REPLACEMENTS.items():
+        str = str.replace(character, replacement)
+    return str
+
+# The single pass, substituting even if the string contains none of the characters
+def replaceSubstitute(str):
+    return UNICODE_PATTERN.sub(unicodeReplacement, unicode(str))
+
+# Returns the descriptions with the typography used on D&D Beyond pages
+def typographicCorpus():
+    corpus = []
+    for desc in CORPUS:
+        desc = unicode(desc)
+        desc = desc.replace(u"'", u"\u2019")
+        desc = desc.replace(u" ft.", u"\xa0ft.")
+        desc = desc.replace(u" - ", u" \u2013 ")
+        desc = desc.replace(u"+", u"\u2009+\u2009")
+        desc = desc.replace(u"fi", u"\ufb01")
+        corpus.append(desc)
+        corpus.append(u"\u201c" + desc + u"\u201d")
+    return corpus
+
+# Returns the strings replaceUnicode is called with while the stat cards of the given pages are parsed
+def parserCorpus(infiles):
+    corpus = []
+    def record(str):
+        corpus.append(unicode(str))
+        return replaceUnicode(str)
+
+    backend = getBackend()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    ddbhelper.replaceUnicode = record
+    try:
+        for infile in infiles:
+            with open(infile) as fp:
+                document, cards = backend.parse(fp.read())
+            for card in cards:
+                Creature.fromDDBStatCard(card, document)
+    finally:
+        ddbhelper.replaceUnicode = replaceUnicode
+        sys.stdout.close()
+        sys.stdout = stdout
+    return corpus
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the time needed to replace typographic characters.")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="number of runs, the best one is reported")
+    parser.add_argument("infiles", nargs="*", default=[ FIXTURE ], help="pages whose stat cards are parsed")
+    args = parser.parse_args()
+
+    strings = parserCorpus(args.infiles)
+    strings = strings * (20000 / len(strings) + 1)
+    for name, corpus in [ ("typographic", typographicCorpus() * 250), ("plain", map(unicode, CORPUS) * 500),
+                          ("parser", strings) ]:
+        print "Corpus:", name+",", len(corpus), "strings,", sum([ len(desc) for desc in corpus ]), "characters"
+
+        for name, replace in [ ("chained", replaceChained), ("chained-all", replaceChainedAll),
+                               ("substitute", replaceSubstitute), ("table", replaceUnicode) ]:
+            elapsed = measure(replace, corpus, args.repeat)
+            print "%-12s %8.3f s %10.0f strings/s" % (name, elapsed, len(corpus) / elapsed)
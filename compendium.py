@@ -0,0 +1,469 @@
+import os
+import re
+import json
+import tempfile
+import collections
+from cStringIO import StringIO
+from json.decoder import scanstring
+from multiprocessing.pool import ThreadPool
+
+from fileutil import openAtomic, writeAtomic
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+WHITESPACE = re.compile("[ \t\n\r]*")
+
+# Returns the position of the first non-whitespace character at or after pos
+def skipWhitespace(text, pos):
+    return WHITESPACE.match(text, pos).end()
+
+# Returns the position of the value of the given key in the JSON object starting at pos, or None if the object
+# does not contain the key. The values of all other keys are skipped.
+def findMember(text, pos, key):
+    decoder = json.JSONDecoder()
+
+    pos = skipWhitespace(text, pos+1)
+    while text[pos] != "}":
+        name, pos = scanstring(text, pos+1)
+        pos = skipWhitespace(text, pos)
+        pos = skipWhitespace(text, pos+1) # Skip :
+        if name == key:
+            return pos
+
+        value, pos = decoder.raw_decode(text, pos)
+        pos = skipWhitespace(text, pos)
+        if text[pos] == ",":
+            pos = skipWhitespace(text, pos+1)
+
+    return None
+
+# Returns the position of the content.Monsters.data array of a compendium pack
+def findMonsters(text):
+    pos = skipWhitespace(text, 0)
+    for key in [ "content", "Monsters", "data" ]:
+        pos = findMember(text, pos, key)
+        if pos is None:
+            raise ValueError("Compendium has no content.Monsters.data section")
+    return pos
+
+# Scans the JSON array of monster entries starting at pos. The entries are decoded one at a time and dropped again.
+# Returns [ entries, end ], with [ name, source, start, end ] of every entry, and the position after the array.
+def scanEntries(text, pos):
+    decoder = json.JSONDecoder()
+
+    entries = []
+    pos = skipWhitespace(text, pos+1)
+    while text[pos] != "]":
+        entry, end = decoder.raw_decode(text, pos)
+        entries.append([ entryName(entry), entrySource(entry), pos, end ])
+
+        pos = skipWhitespace(text, end)
+        if text[pos] == ",":
+            pos = skipWhitespace(text, pos+1)
+    return [entries, pos+1]
+
+# Returns the layout of the monsters of a compendium pack, which is [ start, end, entries ] with the position of the
+# content.Monsters.data array, the position after it and [ name, source, start, end ] of every entry
+def scanLayout(text):
+    start = findMonsters(text)
+    entries, end = scanEntries(text, start)
+    return [start, end, entries]
+
+# Returns the name of a monster entry of the compendium
+def entryName(entry):
+    return entry.get("info", {}).get("name", {}).get("current")
+
+# Returns the source book of a monster entry of the compendium
+def entrySource(entry):
+    return entry.get("source", {}).get("current")
+
+# Serializes monsters to JSON.
+# Packs are written with indent=2 by default, which goes through the pure Python encoder of the json module. If the
+# fast option is set and simplejson is installed, its C encoder is used instead, with the same output. Without an
+# indent, the C encoder of the json module is used.
+class MonsterEncoder(object):
+    def __init__(self, indent=2, fast=False):
+        self.indent = indent
+        self.fast = fast and simplejson is not None
+
+    # Returns True if the fast JSON backend is installed
+    @staticmethod
+    def available():
+        return simplejson is not None
+
+    def dumps(self, monster):
+        if self.indent is None:
+            return json.dumps(monster, separators=(",", ":"))
+        elif self.fast:
+            return simplejson.dumps(monster, indent=self.indent, separators=(", ", ": "))
+        else:
+            return json.dumps(monster, indent=self.indent)
+
+# The Monsters section of a GM Forge compendium pack, which can be updated in place.
+# The pack is scanned once for the position of each monster entry, and an index maps the monster names to their
+# entries. When the pack is written, the text of all other sections and of all unchanged entries is copied from the
+# original file, so only the changed monsters are serialized again. The file is read a range at a time, so the pack
+# is never held in memory as a whole. The entries are written in the style of the encoder, with or without indentation.
+# Unchanged entries written in the other style are serialized again, so the array never mixes both.
+# New and changed monsters are serialized as soon as they are added, and spooled to a temporary file. Only one
+# monster is held in memory at a time, and the pack is written to disk in chunks. Once the pack is saved, it is read
+# again from the saved file and the spool is dropped, so a pack that is updated and saved many times, like in --watch
+# mode, does not keep every version of its monsters.
+class MonsterPack(object):
+    # Indentation of the entries of content.Monsters.data in a pack written with indent=2
+    INDENT = 8
+
+    # Marks entries removed from the pack
+    REMOVED = "removed"
+
+    # Size of the chunks the text of the pack is copied in
+    CHUNK = 1024*1024
+
+    # The pack is read from the given text, or from the file object f if no text is given. The pack reads from f
+    # whenever it is written, so f is kept open until the pack is closed.
+    # The layout of the text is given like scanLayout() returns it, by an index of the pack for example. Without a
+    # layout, the text is scanned.
+    def __init__(self, text=None, encoder=None, layout=None, f=None):
+        self.encoder = encoder or MonsterEncoder()
+        self.spool = None
+        self.file = None
+
+        if f is None:
+            f = StringIO(text)
+        if layout is None:
+            f.seek(0)
+            layout = scanLayout(f.read())
+        self.reset(f, layout)
+
+    # Sets the file the pack is read from and the layout of its monsters. Changes not written to the file are dropped.
+    def reset(self, f, layout):
+        self.close()
+        self.file = f
+        self.modified = False
+        self.unsaved = False    # Modified since the pack was last saved
+
+        # Position of [ and position after ]
+        self.start, self.end, scanned = layout
+
+        # Each entry is [ name, start, end, spooled, source ]. For new or changed entries, spooled is
+        # [ offset, length ] of the text in the spool file.
+        self.entries = []
+        self.index = {}
+        self.duplicates = {}
+
+        for name, source, start, end in scanned:
+            if name in self.index:
+                self.duplicates.setdefault(name, []).append(len(self.entries))
+            else:
+                self.index[name] = len(self.entries)
+            self.entries.append([name, start, end, None, source])
+        self.loaded = len(self.entries) # Number of entries read from the pack
+
+        # Layout of the file, or of the text last written by write()
+        self.layout = layout
+
+    # Reads the pack from the given file
+    @staticmethod
+    def load(path, encoder=None, layout=None):
+        f = open(path, "rb")
+        try:
+            return MonsterPack(None, encoder, layout, f)
+        except:
+            f.close()
+            raise
+
+    # Returns True if the pack contains a monster with the given name
+    def __contains__(self, name):
+        return name in self.index
+
+    # Returns the number of monsters in the pack
+    def __len__(self):
+        return len([ entry for entry in self.entries if entry[3] != MonsterPack.REMOVED ])
+
+    # Returns the names of the monsters in the pack
+    def names(self):
+        return self.index.keys()
+
+    # Returns the text of the pack from start to end
+    def read(self, start, end):
+        self.file.seek(start)
+        text = self.file.read(end - start)
+        if len(text) != end - start:
+            raise IOError("Compendium was changed while it was read")
+        return text
+
+    # Copies the text of the pack from start to end, or to the end of the file, to the file object out
+    def copy(self, out, start, end=None):
+        self.file.seek(start)
+        while end is None or start < end:
+            chunk = self.file.read(MonsterPack.CHUNK if end is None else min(MonsterPack.CHUNK, end - start))
+            if not chunk:
+                if end is not None:
+                    raise IOError("Compendium was changed while it was read")
+                break
+            out.write(chunk)
+            start += len(chunk)
+
+    # Returns the JSON text of the given entry
+    def entryText(self, entry):
+        if entry[3] is None:
+            return self.read(entry[1], entry[2])
+
+        offset, length = entry[3]
+        self.spool.seek(offset)
+        return self.spool.read(length)
+
+    # Writes the text of a new or changed entry to the spool file. Returns [ offset, length ].
+    def spoolText(self, text):
+        if not self.spool:
+            self.spool = tempfile.TemporaryFile()
+        self.spool.seek(0, 2)
+        offset = self.spool.tell()
+        self.spool.write(text)
+        return [offset, len(text)]
+
+    # Serializes a monster the way it is written inside the pack
+    def serialize(self, monster):
+        text = self.encoder.dumps(monster)
+        if self.encoder.indent is not None:
+            text = text.replace("\n", "\n" + " " * MonsterPack.INDENT)
+        return text
+
+    # Adds the monster to the pack, or replaces the monster with the same name.
+    # Returns "added", "updated" or "unchanged".
+    def upsert(self, monster):
+        name = entryName(monster)
+        text = self.serialize(monster)
+
+        # Remove monsters that were added several times
+        for i in self.duplicates.pop(name, []):
+            self.entries[i][3] = MonsterPack.REMOVED
+            self.modified = self.unsaved = True
+
+        i = self.index.get(name)
+        if i is None:
+            self.index[name] = len(self.entries)
+            self.entries.append([name, None, None, self.spoolText(text), entrySource(monster)])
+            self.modified = self.unsaved = True
+            return "added"
+
+        if self.entryText(self.entries[i]) == text:
+            return "unchanged"
+
+        self.entries[i][3] = self.spoolText(text)
+        self.entries[i][4] = entrySource(monster)
+        self.modified = self.unsaved = True
+        return "updated"
+
+    # Removes the monster with the given name. Returns True if the pack contained it.
+    def remove(self, name):
+        i = self.index.pop(name, None)
+        if i is None:
+            return False
+        for j in [ i ] + self.duplicates.pop(name, []):
+            self.entries[j][3] = MonsterPack.REMOVED
+        self.modified = self.unsaved = True
+        return True
+
+    # Sorts the monsters added since the pack was read by name, so the written pack does not depend on the order
+    # they were added in
+    def sortAdded(self):
+        self.entries[self.loaded:] = sorted(self.entries[self.loaded:], key=lambda entry: entry[0])
+        for i in range(self.loaded, len(self.entries)):
+            if self.entries[i][3] != MonsterPack.REMOVED:
+                self.index[self.entries[i][0]] = i
+
+    # Writes the whole pack to the given file object, and keeps the layout of the written text in layout
+    def write(self, f):
+        if not self.modified:
+            self.copy(f, 0)
+            self.layout = [self.start, self.end, [ [entry[0], entry[4], entry[1], entry[2]] for entry in self.entries ]]
+            return
+
+        if self.encoder.indent is not None:
+            separator = ", \n" + " " * MonsterPack.INDENT
+            opening = "[\n" + " " * MonsterPack.INDENT
+            closing = "\n" + " " * (MonsterPack.INDENT-2) + "]"
+        else:
+            separator = ","
+            opening = "["
+            closing = "]"
+
+        self.copy(f, 0, self.start)
+
+        indented = self.encoder.indent is not None
+        entries = []
+        pos = self.start
+        first = True
+        for entry in self.entries:
+            if entry[3] == MonsterPack.REMOVED:
+                continue
+
+            f.write(opening if first else separator)
+            pos += len(opening if first else separator)
+            first = False
+            text = self.entryText(entry)
+            if entry[3] is None and ("\n" in text) != indented:
+                text = self.serialize(json.loads(text, object_pairs_hook=collections.OrderedDict))
+            length = len(text)
+            f.write(text)
+            entries.append([entry[0], entry[4], pos, pos+length])
+            pos += length
+
+        f.write("[]" if first else closing)
+        pos += len("[]" if first else closing)
+        self.copy(f, self.end)
+        self.layout = [self.start, pos, entries]
+
+    # Returns the text of the whole pack
+    def dumps(self):
+        f = StringIO()
+        self.write(f)
+        return f.getvalue()
+
+    # Writes the pack to the given file. The file is replaced atomically.
+    # The pack can still be updated and saved again afterwards. It continues from the saved file then, with the
+    # monsters of the original pack still counted as read, so sortAdded() sorts all monsters added since.
+    def save(self, path):
+        loaded = len([ entry for entry in self.entries[:self.loaded] if entry[3] != MonsterPack.REMOVED ])
+        with openAtomic(path) as f:
+            self.write(f)
+
+        self.reset(open(path, "rb"), self.layout)
+        self.loaded = loaded
+
+    # Closes the file of the pack and removes the spool file
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if self.spool:
+            self.spool.close()
+            self.spool = None
+
+# Ways to split a compendium into shards
+class ShardBy(object):
+    SOURCE  = "source"      # One shard per source book
+    INITIAL = "initial"     # One shard per initial of the monster names
+
+# A compendium written as several packs, the shards, and a manifest listing them.
+# Every monster goes to the shard of its source book or initial. The shards are only read once monsters are added
+# to them, and only written if their monsters changed, so updating a single book neither reads nor writes the
+# others. The changed shards are written in parallel.
+# The manifest lists the names of the monsters of every shard, so a monster whose source changed is removed from
+# the shard it was in before, without reading all shards.
+class ShardedPack(object):
+    # Content of a new shard
+    EMPTY = '{"content": {"Monsters": {"data": []}}}'
+
+    def __init__(self, folder, by=ShardBy.SOURCE, encoder=None, prefix="comp", jobs=4):
+        self.folder = folder
+        self.by = by
+        self.encoder = encoder or MonsterEncoder()
+        self.prefix = prefix
+        self.jobs = jobs
+        self.packs = {}     # Maps the key of each shard read to its MonsterPack
+
+        # The manifest maps the key of every shard to its file, number of monsters and their names
+        self.manifestfile = os.path.join(folder, prefix + "-manifest.json")
+        self.shards = {}
+        if os.path.isfile(self.manifestfile):
+            with open(self.manifestfile) as f:
+                manifest = json.load(f)
+            if manifest.get("by") == by:
+                self.shards = dict([ (shard["key"], shard) for shard in manifest["shards"] ])
+
+        self.files = dict([ (key, os.path.join(folder, shard["file"])) for key, shard in self.shards.items() ])
+        self.owners = {}    # Maps the name of every monster to the key of its shard
+        for key, shard in self.shards.items():
+            # Manifests written before the names were listed
+            names = shard["names"] if "names" in shard else self.pack(key).names()
+            for name in names:
+                self.owners[name] = key
+
+    # Returns the number of shards
+    def __len__(self):
+        return len(self.shards)
+
+    # Returns the key of the shard the monster belongs to
+    def shardKey(self, monster):
+        if self.by == ShardBy.INITIAL:
+            initial = (entryName(monster) or " ")[0].upper()
+            return initial if initial.isalpha() else "#"
+        return (entrySource(monster) or "").strip() or "Unknown"
+
+    # Returns the path of the file of the shard with the given key. Keys that only differ in case or punctuation get
+    # files with a numbered suffix, so no two shards share a file.
+    def shardPath(self, key):
+        path = self.files.get(key)
+        if path is None:
+            name = re.sub("[^a-z0-9]+", "-", key.lower()).strip("-") or "other"
+            used = set(self.files.values())
+            path = os.path.join(self.folder, self.prefix + "-" + name + ".json")
+            n = 2
+            while path in used:
+                path = os.path.join(self.folder, self.prefix + "-" + name + "-" + str(n) + ".json")
+                n += 1
+            self.files[key] = path
+        return path
+
+    # Returns the shard with the given key, which is read on first use
+    def pack(self, key):
+        pack = self.packs.get(key)
+        if pack is None:
+            path = self.shardPath(key)
+            if os.path.isfile(path):
+                pack = MonsterPack.load(path, self.encoder)
+            else:
+                pack = MonsterPack(ShardedPack.EMPTY, self.encoder)
+            self.packs[key] = pack
+        return pack
+
+    # Adds the monster to its shard, or replaces the monster with the same name in it. If the monster is in another
+    # shard, because its source changed, it is removed from there. Returns "added", "updated" or "unchanged".
+    def upsert(self, monster):
+        name = entryName(monster)
+        key = self.shardKey(monster)
+        previous = self.owners.get(name)
+        self.owners[name] = key
+        if previous is not None and previous != key and self.pack(previous).remove(name):
+            self.pack(key).upsert(monster)
+            return "updated"
+        return self.pack(key).upsert(monster)
+
+    # Sorts the monsters added to every shard by name
+    def sortAdded(self):
+        for pack in self.packs.values():
+            pack.sortAdded()
+
+    # Writes all shards whose monsters changed, and the manifest. Returns the number of shards written.
+    def save(self):
+        changed = []
+        for key, pack in self.packs.items():
+            path = self.shardPath(key)
+            if pack.unsaved or not os.path.isfile(path):
+                changed.append([pack, path])
+            self.shards[key] = { "key" : key, "file" : os.path.basename(path), "monsters" : len(pack),
+                                 "names" : sorted(pack.names()) }
+
+        if changed:
+            pool = ThreadPool(min(self.jobs, len(changed)))
+            try:
+                pool.map(lambda shard: shard[0].save(shard[1]), changed)
+            finally:
+                pool.close()
+                pool.join()
+
+        manifest = json.dumps({ "by" : self.by, "shards" : [ self.shards[key] for key in sorted(self.shards) ] },
+                              indent=2, sort_keys=True)
+        if not os.path.isfile(self.manifestfile) or open(self.manifestfile).read() != manifest:
+            writeAtomic(self.manifestfile, manifest)
+        return len(changed)
+
+    # Removes the spool files of all shards
+    def close(self):
+        for pack in self.packs.values():
+            pack.close()
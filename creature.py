@@ -1,22 +1,43 @@
 #!/bin/python2
 
-import re
 import json
 import math
 from bs4 import BeautifulSoup
-from objdict import ObjDict
+from collections import OrderedDict
 
 from ddbhelper import *
+from log import LOG, ERRORS
+
+# Version of the parser. Increment it whenever the parsed creatures change, so cached results are not reused.
+PARSER_VERSION = 3
 
 # Represents an ability or feat
-class Ability:
+class Ability(object):
+    __slots__ = [ "name", "desc", "source", "is_attack", "attack_type", "to_hit", "reach", "target", "damage",
+                  "damage_die", "damage_type", "secondary_damage", "secondary_damage_die", "secondary_damage_type" ]
+
     def __init__(self, name, desc):
         self.name = name
         self.desc = desc
         self.source = None
 
+        # Weapon attack info. These are None if this is not a weapon attack.
+        self.is_attack              = False
+        self.attack_type            = None
+        self.to_hit                 = None
+        self.reach                  = None
+        self.target                 = None
+        self.damage                 = None
+        self.damage_die             = None
+        self.damage_type            = None
+        self.secondary_damage       = None
+        self.secondary_damage_die   = None
+        self.secondary_damage_type  = None
+
         # If this is a weapon attack, parse additional info
-        m = re.search("(\w*) Weapon Attack: ([+-]\d*) to hit, reach (.*?), (.*?)\. Hit: (\d*) \((.*?)\) (\w*) damage\s*(plus (\d*) \((.*)\) (.*) damage)?", desc)
+        m = None
+        if DDBPatterns.WEAPON_ATTACK_TEXT in desc:
+            m = DDBPatterns.WEAPON_ATTACK.search(desc)
         if m:
             self.is_attack = True
             self.attack_type = m.group(1)
@@ -31,15 +52,22 @@ class Ability:
                 self.secondary_damage = m.group(9)
                 self.secondary_damage_die = m.group(10)
                 self.secondary_damage_type = m.group(11)
-        else:
-            self.is_attack = False
-
-        if desc.startswith("Melee Weapon Attack") or desc.startswith("Ranged Weapon Attack"):
-            m = re.search("", desc)
 
     def __str__(self):
         return self.name
 
+    # Returns the ability as a plain dict
+    def toRecord(self):
+        return dict([ (key, getattr(self, key)) for key in Ability.__slots__ ])
+
+    # Creates an ability from a dict returned by toRecord, without parsing the description again
+    @staticmethod
+    def fromRecord(record):
+        ability = Ability.__new__(Ability)
+        for key in Ability.__slots__:
+            setattr(ability, key, record.get(key))
+        return ability
+
     # Creates a list of Abilities from the given list of [name, descriptions]
     @staticmethod
     def fromList(list):
@@ -48,9 +76,145 @@ class Ability:
             abilities.append(Ability(l[0], l[1]))
         return abilities
 
+# Represents the commonly recurring element "xy": { "name": "Xy", "current": "Current Value" }
+def Element(name, current=None):
+    element = OrderedDict()
+    element["name"] = name
+    if current:
+        element["current"] = current
+    return element
+
+# Returns an OrderedDict of the given [ key, value ] pairs
+def Object(*items):
+    return OrderedDict(items)
+
+# The parts of the GM Forge representation of a creature that are the same for every creature.
+# They are built once and shared by all creatures returned by toFiveForge, so those must never be modified.
+class FiveForge(object):
+    INFO_NOTES      = Element("Description")
+    INFO_CLASS      = Element("Class")
+    INFO_BACKGROUND = Element("Background")
+    ARTWORK         = Element("Artwork")
+
+    EXPERIENCE = Object(
+        ("level", Element("Level", 1)),
+        ("cr", Element("Challenge Rating", 14)),
+        ("exp", Element("Experience")))
+
+    HIT_DICE        = Element("Hit Dice")
+    SPEED           = Element("Speed")
+    OFFENSIVE       = Element("Weapon Modifier")
+    SPELLCASTING    = Element("Spellcasting Ability")
+    INSPIRATION     = Element("Inspiration")
+    DEATH_SAVES     = Element("Death Saves")
+
+    TRAITS = Object()
+
+    PERSONALITY = Object(
+        ("traits", Element("Traits")),
+        ("ideals", Element("Ideals")),
+        ("bonds", Element("Bonds")),
+        ("flaws", Element("Flaws")))
+
+    # [ key, attribute, name ] of each ability. The save bonus is in the attribute with the suffix _save.
+    ABILITIES = [
+        ["str", "strength", "Strength"],
+        ["dex", "dexterity", "Dexterity"],
+        ["con", "constitution", "Constitution"],
+        ["int", "intelligence", "Intelligence"],
+        ["wis", "wisdom", "Wisdom"],
+        ["cha", "charisma", "Charisma"] ]
+
+    # [ key, attribute, name, ability ] of each skill
+    SKILLS = [
+        ["acr", "acrobatics", "Acrobatics", "dex"],
+        ["ani", "animal_handling", "Animal Handling", "wis"],
+        ["arc", "arcana", "Arcana", "int"],
+        ["ath", "athletics", "Athletics", "str"],
+        ["dec", "deception", "Deception", "cha"],
+        ["his", "history", "History", "int"],
+        ["ins", "insight", "Insight", "wis"],
+        ["int", "intimidation", "Intimidation", "cha"],
+        ["inv", "investigation", "Investigation", "int"],
+        ["med", "medicine", "Medicine", "wis"],
+        ["nat", "nature", "Nature", "int"],
+        ["per", "perception", "Perception", "wis"],
+        ["pfm", "performance", "Performance", "cha"],
+        ["prs", "persuasion", "Persuasion", "cha"],
+        ["rel", "religion", "Religion", "int"],
+        ["sle", "sleight_of_hand", "Sleight of Hand", "dex"],
+        ["ste", "stealth", "Stealth", "dex"],
+        ["sur", "survival", "Survival", "wis"] ]
+
+    # Maps the key of each skill to its element, for creatures without and with a bonus to the skill
+    SKILL_ELEMENTS = {}
+    for key, attribute, name, ability in SKILLS:
+        SKILL_ELEMENTS[key] = []
+        for proficient in [ False, True ]:
+            skill = Element(name, proficient)
+            skill["ability"] = ability
+            SKILL_ELEMENTS[key].append(skill)
+    del key, attribute, name, ability, proficient, skill
+
+    CURRENCY = Object(
+        ("pp", Element("Platinum")),
+        ("gp", Element("Gold")),
+        ("sp", Element("Silver")),
+        ("cp", Element("Copper")))
+
+    SPELLS = Object(
+        ("spell0", Element("Cantrip")),
+        ("spell1", Element("1st Level")),
+        ("spell2", Element("2nd Level")),
+        ("spell3", Element("3rd Level")),
+        ("spell4", Element("4th Level")),
+        ("spell5", Element("5th Level")),
+        ("spell6", Element("6th Level")),
+        ("spell7", Element("7th Level")),
+        ("spell8", Element("8th Level")),
+        ("spell9", Element("9th Level")))
+
+    RESOURCES = Object(
+        ("legendary", Element("Legendary Actions")),
+        ("primary", Element("Primary Resource")),
+        ("secondary", Element("Secondary Resource")))
+
+    TAGS = Object()
+    SPELLBOOK = []
+    SYNC = Object()
+    FLAGS = Object(("npc", 1))
+
+    # Constant parts of inventory items and feats
+    SOURCE          = Element("Source")
+    QUANTITY        = Element("Quantity", 0)
+    PRICE           = Element("Price", 0)
+    WEIGHT          = Element("Weight", 0)
+    WEAPON_TYPE     = Element("Weapon Type")
+    PROPERTIES      = Element("Properties")
+    PROFICIENT      = Element("Proficient", 0)
+    MODIFIER        = Element("Offensive Ability")
+    FEAT_TYPE       = Element("Feat Type")
+    REQUIREMENTS    = Element("Requirements")
+    TIME            = Element("Time")
+    COST            = Element("Ability Cost")
+    ITEM_TABS       = Object(("content-tabs", "tab-notes"))
+
 # Defines the attributes of a creature
 # The structure is similar to the one found in http://www.dnd5eapi.co/
 class Creature(object):
+    __slots__ = [ "name", "character_level", "size", "type", "subtype", "alignment", "armor_class", "hit_points",
+                  "hit_points_formula", "speed", "initiative",
+                  "senses", "languages", "language", "challenge_rating", "experience_reward",
+                  "strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma",
+                  "strength_save", "dexterity_save", "constitution_save", "intelligence_save", "wisdom_save",
+                  "charisma_save",
+                  "acrobatics", "animal_handling", "arcana", "athletics", "deception", "history", "insight",
+                  "intimidation", "investigation", "medicine", "nature", "perception", "performance", "persuasion",
+                  "religion", "sleight_of_hand", "stealth", "survival",
+                  "damage_vulnerabilities", "damage_resistances", "damage_immunities", "condition_immunities",
+                  "special_abilities", "actions", "legendary_actions", "reactions",
+                  "source", "url", "image" ]
+
     def __init__(self):
         self.name        = "UNNAMED CREATURE"
         self.character_level = None
@@ -67,6 +231,7 @@ class Creature(object):
         # Senses, languages, challenge
         self.senses             = ""
         self.languages          = ""
+        self.language           = ""    # Languages as found on the stat card
         self.challenge_rating   = None
         self.experience_reward  = None
 
@@ -136,19 +301,30 @@ class Creature(object):
     def filename(self):
         return self.name.replace("/", "-")
 
-    # Parses a single D&D Beyond stat card and returns the resulting creature
+    # Parses a single D&D Beyond stat card and returns the resulting creature.
+    # The DDBDocument of the page the card is part of should be given. Otherwise, it is looked up in the tree of the
+    # card for every card.
     @staticmethod
-    def fromDDBStatCard(card):
+    def fromDDBStatCard(card, document=None):
+        if document is None:
+            document = DDBDocument.fromCard(card)
+
         creature = Creature()
 
         creature.name   = ddbCreatureName(card)
-        creature.url    = ddbLink(card)
-        creature.source = ddbSource(card)
+        creature.url    = document.resolve(ddbLink(card))
+        creature.source = document.source
 
-        print "\tParsing", creature.name+"..."
+        LOG.debug("\tParsing", creature.name+"...")
+
+        # Walk through the card once, collecting the stats, abilities, feats and actions
+        sections = ddbParseStatCard(card)
 
         # Parse Stat-Block-Data (AC, HP, Speed, Senses, Language, Challenge)
-        stats = ddbParseStats(card)
+        stats = sections[DDBSections.STATS]
+        if not stats:
+            ERRORS.add(creature.name, "Unable to parse type")
+            return None
         creature.size           = stats[DDBStatnames.SIZE]
         creature.type           = stats[DDBStatnames.TYPE]
         creature.subtype        = stats[DDBStatnames.SUBTYPE]
@@ -157,9 +333,9 @@ class Creature(object):
 
         # Split hit points and hit point formula
         hit_points = stats[DDBStatnames.HIT_POINTS]
-        m = re.match("(.*)\s*\((.*)\)", hit_points)
+        m = DDBPatterns.HIT_POINTS.match(hit_points)
         if not m or m.groups() < 2:
-            print "Unable to parse Hit Points!"
+            ERRORS.add(creature.name, "Unable to parse Hit Points", hit_points)
             return None
         creature.hit_points = int(m.group(1))
         creature.hit_points_formula = m.group(2)
@@ -168,9 +344,9 @@ class Creature(object):
         creature.language        = stats[DDBStatnames.LANGUAGES]
 
         # Split challenge erating and experience reward
-        m = re.match("([0-9/]*?)\s\((.*)\s*XP\)", stats[DDBStatnames.CHALLENGE_RATING])
+        m = DDBPatterns.CHALLENGE.match(stats[DDBStatnames.CHALLENGE_RATING])
         if not m:
-            print "Unable to parse Challenge Rating!"
+            ERRORS.add(creature.name, "Unable to parse Challenge Rating", stats[DDBStatnames.CHALLENGE_RATING])
             return None
         # Transform CR to float
         cr = eval(m.group(1)+".0")
@@ -178,7 +354,7 @@ class Creature(object):
         creature.experience_reward = m.group(2)
 
         # Parse abilities
-        abilities = ddbParseAbilities(card)
+        abilities = sections[DDBSections.ABILITIES]
         creature.strength       = int(abilities[DDBStatnames.STRENGTH])
         creature.dexterity      = int(abilities[DDBStatnames.DEXTERITY])
         creature.constitution   = int(abilities[DDBStatnames.CONSTITUTION])
@@ -187,70 +363,67 @@ class Creature(object):
         creature.charisma       = int(abilities[DDBStatnames.CHARISMA])
 
         # Parse Stat-Block-Body (Feats and Actions)
-        creature.special_abilities  = Ability.fromList(ddbParseSpecialAbilities(card))
-        creature.actions            = Ability.fromList(ddbParseActions(card))
-        creature.legendary_actions  = Ability.fromList(ddbParseLegendaryActions(card))
-        creature.reactions          = Ability.fromList(ddbParseReactions(card))
+        creature.special_abilities  = Ability.fromList(sections[DDBSections.SPECIAL_ABILITIES])
+        creature.actions            = Ability.fromList(sections[DDBSections.ACTIONS])
+        creature.legendary_actions  = Ability.fromList(sections[DDBSections.LEGENDARY_ACTIONS])
+        creature.reactions          = Ability.fromList(sections[DDBSections.REACTIONS])
 
         # Search for an image
-        creature.image = ddbImage(card)
+        creature.image = document.resolve(ddbImage(card))
         if creature.image:
-            print "\t\tFound an image"
+            LOG.debug("\t\tFound an image")
         
         return creature
 
 
+    # Returns the creature as a plain dict, which can be pickled and sent between processes.
+    # All abilities are converted to plain dicts as well.
+    def toRecord(self):
+        record = dict([ (key, getattr(self, key)) for key in Creature.__slots__ ])
+        for key in ["special_abilities", "actions", "legendary_actions", "reactions"]:
+            record[key] = [ ability.toRecord() for ability in record[key] ]
+        return record
+
+    # Creates a creature from a dict returned by toRecord
+    @staticmethod
+    def fromRecord(record):
+        creature = Creature()
+        for key, value in record.items():
+            setattr(creature, key, value)
+        for key in ["special_abilities", "actions", "legendary_actions", "reactions"]:
+            setattr(creature, key, [ Ability.fromRecord(ability) for ability in record[key] ])
+        return creature
+
     # Returns a JSON object of the creature.
     def json(self):
-        return json.dumps(self, default=lambda self: self.__dict__, indent=4, sort_keys=False)
+        return json.dumps(self.toRecord(), indent=4, sort_keys=False)
 
+    # Returns the creature in the format of GM Forge compendium packs.
+    # The blocks that are the same for every creature are shared with all other creatures, so only the fields that
+    # vary are built for each creature. The returned data must not be modified.
     def toFiveForge(self):
-        # Represents the commonly recurring element "xy": { "name": "Xy", "current": "Current Value" }
-        class Element(ObjDict):
-            def __init__(self, name, current=None):
-                ObjDict.__init__(self)
-                del self["__type__"] # Delete __type__ field
-                self["name"] = name
-                if current:
-                    self["current"] = current
-                return
-
-        data = ObjDict()
+        data = OrderedDict()
         data["_t"] = "c"
 
         ### INFO BLOCK
-        data["info"] = ObjDict()
-        info = data["info"]
-
-        # Name
-        name = Element("Name", self.name)
-        info["name"] = name
+        info = OrderedDict()
+        data["info"] = info
 
-        # Img
+        info["name"] = Element("Name", self.name)
         if self.image:
-            img = Element("Artwork", os.path.join("custom", "monsters", self.filename()+".jpeg")) # TODO: Add image path
+            info["img"] = Element("Artwork", os.path.join("custom", "monsters", self.filename()+".jpeg")) # TODO: Add image path
         else:
-            img = Element("Artwork")
-        info["img"] = img
-
-        # Description
-        notes = Element("Description")
-        info["notes"] = notes
+            info["img"] = FiveForge.ARTWORK
+        info["notes"] = FiveForge.INFO_NOTES
 
         # Race
         if self.subtype:
-            race = Element("Race", self.type + " ("+self.subtype+")")
+            info["race"] = Element("Race", self.type + " ("+self.subtype+")")
         else:
-            race = Element("Race", self.type)
-        info["race"] = race
+            info["race"] = Element("Race", self.type)
 
-        # Class
-        class_ = Element("Class")
-        info["class"] = class_
-
-        # Background
-        background = Element("Background")
-        info["background"] = background
+        info["class"] = FiveForge.INFO_CLASS
+        info["background"] = FiveForge.INFO_BACKGROUND
 
         # Returns abbreviation of the given alignment. Ex: Lawful Evil -> le
         def shortenAlignment(alignment):
@@ -264,27 +437,13 @@ class Creature(object):
             else:
                 return None
 
-        # Alignment
-        alignment = Element("Alignment", shortenAlignment(self.alignment))
-        info["alignment"] = alignment
+        info["alignment"] = Element("Alignment", shortenAlignment(self.alignment))
         ### END OF INFO BLOCK
 
-        ### EXPERIENCE BLOCK
-        data["experience"] = ObjDict()
-        experience = data["experience"]
-
-        level = Element("Level", 1)
-        experience["level"] = level
-
-        cr = Element("Challenge Rating", 14)
-        experience["cr"] = cr
-
-        exp = Element("Experience")
-        experience["exp"] = exp
-        ### END OF EXPERIENCE BLOCK
+        data["experience"] = FiveForge.EXPERIENCE
 
         ### ATTRIBUTES BLOCK
-        attributes = ObjDict()
+        attributes = OrderedDict()
         data["attributes"] = attributes
 
         hp = Element("Hit Points", self.hit_points)
@@ -292,320 +451,95 @@ class Creature(object):
         hp["formula"] = self.hit_points_formula
         attributes["hp"] = hp
 
-        hd = Element("Hit Dice")
-        attributes["hd"] = hd
+        attributes["hd"] = FiveForge.HIT_DICE
 
         if self.character_level:
             prof_bonus = int(2 + math.floor(self.character_level-1/4))
         else:
             prof_bonus = int(2 + math.floor(self.challenge_rating-1/4))
-        proficiency = Element("Proficiency Bonus", prof_bonus)
-        attributes["proficiency"] = proficiency
+        attributes["proficiency"] = Element("Proficiency Bonus", prof_bonus)
 
-        ac = Element("Armor Class", self.armor_class)
-        attributes["ac"] = ac
+        attributes["ac"] = Element("Armor Class", self.armor_class)
 
         # Split speed into regular speed and additional speeds (like flying, swimming, ...)
-        m = re.match("(\d*) ft.(,\s*(.*)\s*)", self.speed)
+        m = DDBPatterns.SPEED.match(self.speed)
         if m:
             speed = Element("Speed", m.group(1))
             if m.group(3):
                 speed["extra"] = m.group(3)
         else:
-            speed = Element("Speed")
+            speed = FiveForge.SPEED
         attributes["speed"] = speed
 
-        initiative = Element("Initiative", self.initiative)
-        attributes["initiative"] = initiative
-
-        offensive = Element("Weapon Modifier")
-        attributes["offensive"] = offensive
-
-        spellcasting = Element("Spellcasting Ability")
-        attributes["spellcasting"] = spellcasting
-
-        inspiration = Element("Inspiration")
-        attributes["inspiration"] = inspiration
-
-        death = Element("Death Saves")
-        attributes["death saves"] = death
+        attributes["initiative"] = Element("Initiative", self.initiative)
+        attributes["offensive"] = FiveForge.OFFENSIVE
+        attributes["spellcasting"] = FiveForge.SPELLCASTING
+        attributes["inspiration"] = FiveForge.INSPIRATION
+        attributes["death saves"] = FiveForge.DEATH_SAVES
         ### END OF ATTRIBUTES BLOCK
 
         ### TRAITS BLOCK
-        traits = ObjDict()
-        data["traits"] = traits
-
-        size = Element("Size", self.size)
-        data["size"] = size
-
-        di = Element("Damage Immunities", self.damage_immunities)
-        data["di"] = di
-
-        dr = Element("Damage Resistance", self.damage_resistances)
-        data["dr"] = dr
-
-        ci = Element("Condition Immunities", self.condition_immunities)
-        data["ci"] = ci
-
-        dv = Element("Damage Vulnerabilities", self.damage_vulnerabilities)
-        data["dv"] = dv
-
-        senses = Element("Senses", self.senses)
-        data["senses"] = senses
-
-        languages = Element("Languages", self.languages)
-        data["languages"] = languages
+        data["traits"] = FiveForge.TRAITS
+        data["size"] = Element("Size", self.size)
+        data["di"] = Element("Damage Immunities", self.damage_immunities)
+        data["dr"] = Element("Damage Resistance", self.damage_resistances)
+        data["ci"] = Element("Condition Immunities", self.condition_immunities)
+        data["dv"] = Element("Damage Vulnerabilities", self.damage_vulnerabilities)
+        data["senses"] = Element("Senses", self.senses)
+        data["languages"] = Element("Languages", self.languages)
         ### END OF TRAITS BLOCK
 
-        ### PERSONALITY BLOCK
-        data["personality"] = ObjDict()
-        personality = data["personality"]
-
-        traits = Element("Traits")
-        personality["traits"] = traits
-
-        ideals = Element("Ideals")
-        personality["ideals"] = ideals
-
-        bonds = Element("Bonds")
-        personality["bonds"] = bonds
-
-        flaws = Element("Flaws")
-        personality["flaws"] = flaws
-        ### END OF PERSONALITY BLOCK
+        data["personality"] = FiveForge.PERSONALITY
 
         ### ABILITIES BLOCK
-        abilities = ObjDict()
+        abilities = OrderedDict()
         data["abilities"] = abilities
 
-        def mod(ability):
-            return int(ability-10/2)
-
-        def isProficient(save):
-            if save == 0 or save == None:
-                return 0
-            else:
-                return 1
-
-        str_ = Element("Strength", self.strength)
-        str_mod = ObjDict()
-        str_mod["mod"] = mod(self.strength)
-        str_["modifiers"] = str_mod
-        str_["proficient"] = isProficient(self.strength_save)
-        abilities["str"] = str_
-
-        dex = Element("Dexterity", self.dexterity)
-        dex_mod = ObjDict()
-        dex_mod["mod"] = mod(self.dexterity)
-        dex["modifiers"] = dex_mod
-        dex["proficient"] = isProficient(self.dexterity_save)
-        abilities["dex"] = dex
-
-        con = Element("Constitution", self.constitution)
-        con_mod = ObjDict()
-        con_mod["mod"] = mod(self.constitution)
-        con["modifiers"] = con_mod
-        con["proficient"] = isProficient(self.constitution_save)
-        abilities["con"] = con
-
-        int_ = Element("Intelligence", self.intelligence)
-        int_mod = ObjDict()
-        int_mod["mod"] = mod(self.intelligence)
-        int_["modifiers"] = int_mod
-        int_["proficient"] = isProficient(self.intelligence_save)
-        abilities["int"] = int_
-
-        wis = Element("Wisdom", self.wisdom)
-        wis_mod = ObjDict()
-        wis_mod["mod"] = mod(self.wisdom)
-        wis["modifiers"] = wis_mod
-        wis["proficient"] = isProficient(self.wisdom_save)
-        abilities["wis"] = wis
-
-        cha = Element("Charisma", self.charisma)
-        cha_mod = ObjDict()
-        cha_mod["mod"] = mod(self.charisma)
-        cha["modifiers"] = cha_mod
-        cha["proficient"] = isProficient(self.charisma_save)
-        abilities["cha"] = cha
+        for key, attribute, name in FiveForge.ABILITIES:
+            score = getattr(self, attribute)
+            save = getattr(self, attribute+"_save")
+            ability = Element(name, score)
+            ability["modifiers"] = Object(("mod", int(score-10/2)))
+            ability["proficient"] = 0 if save == 0 or save == None else 1
+            abilities[key] = ability
         ### END OF ABILITIES BLOCK
 
         ### SKILLS BLOCK
-        skills = ObjDict()
+        skills = OrderedDict()
         data["skills"] = skills
 
-        acr = Element("Acrobatics", self.acrobatics != 0)
-        acr["ability"] = "dex"
-        skills["acr"] = acr
-
-        ani = Element("Animal Handling", self.animal_handling != 0)
-        ani["ability"] = "wis"
-        skills["ani"] = ani
-
-        arc = Element("Arcana", self.arcana != 0)
-        arc["ability"] = "int"
-        skills["arc"] = arc
-
-        ath = Element("Athletics", self.athletics != 0)
-        ath["ability"] = "str"
-        skills["ath"] = ath
-
-        dec = Element("Deception", self.deception != 0)
-        dec["ability"] = "cha"
-        skills["dec"] = dec
-
-        his = Element("History", self.history != 0)
-        his["ability"] = "int"
-        skills["his"] = his
-
-        ins = Element("Insight", self.insight != 0)
-        ins["ability"] = "wis"
-        skills["ins"] = ins
-
-        intim = Element("Intimidation", self.intimidation != 0)
-        intim["ability"] = "cha"
-        skills["int"] = intim
-
-        inv = Element("Investigation", self.investigation != 0)
-        inv["ability"] = "int"
-        skills["inv"] = inv
-
-        med = Element("Medicine", self.medicine != 0)
-        med["ability"] = "wis"
-        skills["med"] = med
-
-        nat = Element("Nature", self.nature != 0)
-        nat["ability"] = "int"
-        skills["nat"] = nat
-
-        per = Element("Perception", self.perception != 0)
-        per["ability"] = "wis"
-        skills["per"] = per
-
-        pfm = Element("Performance", self.performance != 0)
-        pfm["ability"] = "cha"
-        skills["pfm"] = pfm
-
-        prs = Element("Persuasion", self.persuasion != 0)
-        prs["ability"] = "cha"
-        skills["prs"] = prs
-
-        rel = Element("Religion", self.religion != 0)
-        rel["ability"] = "int"
-        skills["rel"] = rel
-
-        sle = Element("Sleight of Hand", self.sleight_of_hand != 0)
-        sle["ability"] = "dex"
-        skills["sle"] = sle
-
-        ste = Element("Stealth", self.stealth != 0)
-        ste["ability"] = "dex"
-        skills["ste"] = ste
-
-        sur = Element("Survival", self.survival != 0)
-        sur["ability"] = "wis"
-        skills["sur"] = sur
+        for key, attribute, name, ability in FiveForge.SKILLS:
+            skills[key] = FiveForge.SKILL_ELEMENTS[key][getattr(self, attribute) != 0]
         ### END OF SKILLS BLOCK
 
-        ### CURRENCY BLOCK
-        currency = ObjDict()
-        data["currency"] = currency
-
-        pp = Element("Platinum")
-        currency["pp"] = pp
-
-        gp = Element("Gold")
-        currency["gp"] = gp
-
-        sp = Element("Silver")
-        currency["sp"] = sp
-
-        cp = Element("Copper")
-        currency["cp"] = cp        
-        ### END OF CURRENCY
-
-        ### SPELLS BLOCK
-        spells = ObjDict()
-        data["spells"] = spells
-
-        spell0 = Element("Cantrip")
-        spells["spell0"] = spell0
-
-        spell1 = Element("1st Level")
-        spells["spell1"] = spell1
-        
-        spell2 = Element("2nd Level")
-        spells["spell2"] = spell2
-        
-        spell3 = Element("3rd Level")
-        spells["spell3"] = spell3
-
-        spell4 = Element("4th Level")
-        spells["spell4"] = spell4
-
-        spell5 = Element("5th Level")
-        spells["spell5"] = spell5
-
-        spell6 = Element("6th Level")
-        spells["spell6"] = spell6
-
-        spell7 = Element("7th Level")
-        spells["spell7"] = spell7
-
-        spell8 = Element("8th Level")
-        spells["spell8"] = spell8
-
-        spell9 = Element("9th Level")
-        spells["spell9"] = spell9
-        ### END OF SPELLS BLOCK
-
-        ### RESOURCES BLOCK
-        resources = ObjDict()
-        data["resources"] = resources
-
-        legendary = Element("Legendary Actions")
-        resources["legendary"] = legendary
-
-        primary = Element("Primary Resource")
-        resources["primary"] = primary
-
-        secondary = Element("Secondary Resource")
-        resources["secondary"] = secondary
-        ### END OF RESOURCES BLOCK
-
-        ### SOURCE
+        data["currency"] = FiveForge.CURRENCY
+        data["spells"] = FiveForge.SPELLS
+        data["resources"] = FiveForge.RESOURCES
         data["source"] = Element("Source", self.source)
-
-        ### TAGS
-        data["tags"] = ObjDict()
+        data["tags"] = FiveForge.TAGS
 
         ### INVENTORY BLOCK
-        data["inventory"] = []
-        inventory = data["inventory"]
+        inventory = []
+        data["inventory"] = inventory
 
         # Add each monster attack as a weapon
         for current in self.actions:
             if current.is_attack:
-                feat = ObjDict()
+                feat = OrderedDict()
                 feat["_t"] = "i"
-
-                info = ObjDict()
-                info["name"] = Element("Name", current.name)
-                info["img"] = Element("Artwork")
-                info["notes"] = Element("Description", current.desc)
-                feat["info"] = info
-
-                feat["source"] = Element("Source")
-                feat["tags"] = ObjDict()
-
-                feat["tags"] = ObjDict()
+                feat["info"] = Object(
+                    ("name", Element("Name", current.name)),
+                    ("img", FiveForge.ARTWORK),
+                    ("notes", Element("Description", current.desc)))
+                feat["source"] = FiveForge.SOURCE
+                feat["tags"] = FiveForge.TAGS
                 feat["_type"] = "Weapon"
 
-                feat["quantity"] = Element("Quantity", 0)
-                feat["price"] = Element("Price", 0)
-                feat["weight"] = Element("Weight", 0)
+                feat["quantity"] = FiveForge.QUANTITY
+                feat["price"] = FiveForge.PRICE
+                feat["weight"] = FiveForge.WEIGHT
 
-                feat["type"] = Element("Weapon Type")
+                feat["type"] = FiveForge.WEAPON_TYPE
                 feat["hit"] = Element("Attack Bonus", current.to_hit)
                 feat["damage"] = Element("Damage", current.damage_die)
                 feat["damage"]["type"] = current.damage_type
@@ -613,64 +547,46 @@ class Creature(object):
                 feat["damage2"]["type"] = current.secondary_damage_type
 
                 feat["range"] = Element("Range", current.reach)
-                feat["properties"] = Element("Properties")
-                feat["proficient"] = Element("Proficient", 0)
-                feat["modifier"] = Element("Offensive Ability")
-
-                tabs = ObjDict()
-                tabs["content-tabs"] = "tab-notes"
-                feat["tabs"] = tabs
+                feat["properties"] = FiveForge.PROPERTIES
+                feat["proficient"] = FiveForge.PROFICIENT
+                feat["modifier"] = FiveForge.MODIFIER
+                feat["tabs"] = FiveForge.ITEM_TABS
 
                 inventory.append(feat)
+        ### END OF INVENTORY
 
-        ## END OF INVENTORY
-
-        ### SPELLBOOK
-        data["spellbook"] = []
+        data["spellbook"] = FiveForge.SPELLBOOK
 
         ### FEATS BLOCK
         feats = []
         for current in self.special_abilities + self.actions + self.legendary_actions + self.reactions:
             if not current.is_attack:
-                feat = ObjDict()
+                feat = OrderedDict()
                 feat["_t"] = "i"
-                
-                info = ObjDict()
-                info["name"] = Element("Name", current.name)
-                info["img"] = Element("Artwork")
-                info["notes"] = Element("Description", current.desc)
-                feat["info"] = info
-
-                feat["source"] = Element("Source")
-                feat["tags"] = ObjDict()
+                feat["info"] = Object(
+                    ("name", Element("Name", current.name)),
+                    ("img", FiveForge.ARTWORK),
+                    ("notes", Element("Description", current.desc)))
+                feat["source"] = FiveForge.SOURCE
+                feat["tags"] = FiveForge.TAGS
                 feat["_type"] = "Feat"
-                feat["type"] = Element("Feat Type")
-                feat["requirements"] = Element("Requirements")
-                feat["time"] = Element("Time")
-                feat["cost"] = Element("Ability Cost")
-
-                tabs = ObjDict()
-                tabs["content-tabs"] = "tab-notes"
-                feat["tabs"] = tabs
+                feat["type"] = FiveForge.FEAT_TYPE
+                feat["requirements"] = FiveForge.REQUIREMENTS
+                feat["time"] = FiveForge.TIME
+                feat["cost"] = FiveForge.COST
+                feat["tabs"] = FiveForge.ITEM_TABS
 
                 feats.append(feat)
         data["feats"] = feats
         ### END OF FEATS BLOCK
 
         data["_type"] = "NPC"
-        data["_s"] = ObjDict()
+        data["_s"] = FiveForge.SYNC
         data["_lclock"] = 1
         data["_c"] = "localhost"
         data["_uid"] = None
         data["_sync"] = None
-
-        flags = ObjDict()
-        flags["npc"] = 1
-        data["_flags"] = flags
-
-        tabs = ObjDict()
-        tabs["sidebar-tabs"] = "tab-abilities"
-        tabs["content-tabs"] = "tab-spells"
-        data["flags"] = flags
+        data["_flags"] = FiveForge.FLAGS
+        data["flags"] = FiveForge.FLAGS
 
         return data
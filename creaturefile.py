@@ -0,0 +1,261 @@
+#!/bin/python2
+
+import sys
+import json
+import codecs
+import struct
+import argparse
+
+from creature import Ability, Creature
+from fileutil import openAtomic
+
+# Start of every creature file
+MAGIC = "DDBC"
+
+# Version of the layout of creature files. Files of newer or unknown versions are rejected.
+FORMAT_VERSION = 1
+
+# File extension of creature files
+EXTENSION = ".creatures"
+
+# Tags of the values in a creature file
+class Tag(object):
+    NONE    = 0
+    FALSE   = 1
+    TRUE    = 2
+    INT     = 3     # Zigzag varint
+    FLOAT   = 4     # Big-endian double
+    BYTES   = 5     # Varint length and the bytes of a str, which are added to the string table
+    TEXT    = 6     # Varint length and the UTF-8 encoding of a unicode string, which is added to the string table
+    STRING  = 7     # Varint index of a str or unicode string in the string table
+    LIST    = 8     # Varint count and the values
+    ABILITY = 9     # The values of the fields of an ability, in the order of the header
+    DICT    = 10    # Varint count and the keys and values
+    END     = 11    # Ends the creatures of the file
+
+DOUBLE = struct.Struct(">d")
+VERSION = struct.Struct(">H")
+
+# Writes creatures to a file in a compact binary format.
+# The file starts with a header of the format version and of the names of the fields of Creature and Ability, which
+# are followed by the values of the fields of each creature, in the order of the header. Every value is a tag,
+# followed by its data. Each string is only written the first time it occurs, and referenced by its position in the
+# table of all strings written before after that, so the names of sources, damage types and the like take a few
+# bytes per creature. The creatures are written as they are given, so the file can be written while they are parsed.
+class CreatureWriter(object):
+    def __init__(self, f):
+        self.f = f
+        self.strings = [ {}, {} ]   # Maps the str and the unicode strings written so far to their index
+        self.count = 0              # Number of strings written so far
+        self.written = 0            # Number of creatures written so far
+
+        out = [ MAGIC, VERSION.pack(FORMAT_VERSION) ]
+        for fields in [ Creature.__slots__, Ability.__slots__ ]:
+            self.value(out, list(fields))
+        self.f.write("".join(out))
+
+    @staticmethod
+    def varint(out, n):
+        while n >= 0x80:
+            out.append(chr(n & 0x7f | 0x80))
+            n >>= 7
+        out.append(chr(n))
+
+    # Appends the encoding of the given value to the list of strings out
+    def value(self, out, value):
+        if value is None:
+            out.append(chr(Tag.NONE))
+        elif value is True:
+            out.append(chr(Tag.TRUE))
+        elif value is False:
+            out.append(chr(Tag.FALSE))
+        elif isinstance(value, (int, long)):
+            out.append(chr(Tag.INT))
+            CreatureWriter.varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            out.append(chr(Tag.FLOAT))
+            out.append(DOUBLE.pack(value))
+        elif isinstance(value, basestring):
+            strings = self.strings[isinstance(value, unicode)]
+            index = strings.get(value)
+            if index is not None:
+                out.append(chr(Tag.STRING))
+                CreatureWriter.varint(out, index)
+            else:
+                strings[value] = self.count
+                self.count += 1
+                data = value.encode("utf-8") if isinstance(value, unicode) else value
+                out.append(chr(Tag.TEXT if isinstance(value, unicode) else Tag.BYTES))
+                CreatureWriter.varint(out, len(data))
+                out.append(data)
+        elif isinstance(value, Ability):
+            out.append(chr(Tag.ABILITY))
+            for key in Ability.__slots__:
+                self.value(out, getattr(value, key))
+        elif isinstance(value, (list, tuple)):
+            out.append(chr(Tag.LIST))
+            CreatureWriter.varint(out, len(value))
+            for item in value:
+                self.value(out, item)
+        elif isinstance(value, dict):
+            out.append(chr(Tag.DICT))
+            CreatureWriter.varint(out, len(value))
+            for key, item in value.items():
+                self.value(out, key)
+                self.value(out, item)
+        else:
+            raise TypeError("Cannot write %s values to a creature file" % type(value).__name__)
+
+    def write(self, creature):
+        out = []
+        for key in Creature.__slots__:
+            self.value(out, getattr(creature, key))
+        self.f.write("".join(out))
+        self.written += 1
+
+    # Ends the creatures of the file. Files without the end are rejected by CreatureReader.
+    def close(self):
+        self.f.write(chr(Tag.END))
+
+# Reads the creatures written by a CreatureWriter from a string.
+# The fields are matched by the names in the header, so files written before fields were added to or removed from
+# Creature or Ability can still be read. Fields missing from the file keep their defaults, and fields no longer known
+# are dropped.
+class CreatureReader(object):
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a creature file")
+        try:
+            version = VERSION.unpack_from(data, len(MAGIC))[0]
+        except struct.error:
+            raise ValueError("Creature file is truncated")
+        if not 1 <= version <= FORMAT_VERSION:
+            raise ValueError("Creature file has version %d, only versions 1 to %d can be read" % (version, FORMAT_VERSION))
+
+        self.data = data
+        self.pos = len(MAGIC) + VERSION.size
+        self.strings = []
+        try:
+            self.creatureFields = [ key if key in Creature.__slots__ else None for key in self.value() ]
+            self.abilityFields = [ key if key in Ability.__slots__ else None for key in self.value() ]
+        except (IndexError, struct.error):
+            raise ValueError("Creature file is truncated")
+
+    def varint(self):
+        data = self.data
+        n = ord(data[self.pos])
+        self.pos += 1
+        if n < 0x80:
+            return n
+        n &= 0x7f
+        shift = 7
+        while True:
+            b = ord(data[self.pos])
+            self.pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    # Reads the next value
+    def value(self):
+        tag = ord(self.data[self.pos])
+        self.pos += 1
+
+        if tag == Tag.STRING:
+            return self.strings[self.varint()]
+        elif tag == Tag.NONE:
+            return None
+        elif tag == Tag.INT:
+            n = self.varint()
+            return n >> 1 if not n & 1 else -((n + 1) >> 1)
+        elif tag == Tag.BYTES or tag == Tag.TEXT:
+            length = self.varint()
+            if self.pos + length > len(self.data):
+                raise ValueError("Creature file is truncated")
+            value = self.data[self.pos:self.pos+length]
+            self.pos += length
+            if tag == Tag.TEXT:
+                value = value.decode("utf-8")
+            self.strings.append(value)
+            return value
+        elif tag == Tag.TRUE:
+            return True
+        elif tag == Tag.FALSE:
+            return False
+        elif tag == Tag.LIST:
+            return [ self.value() for i in xrange(self.varint()) ]
+        elif tag == Tag.ABILITY:
+            ability = Ability.__new__(Ability)
+            for key in Ability.__slots__:
+                setattr(ability, key, None)
+            for key in self.abilityFields:
+                value = self.value()
+                if key:
+                    setattr(ability, key, value)
+            return ability
+        elif tag == Tag.FLOAT:
+            value = DOUBLE.unpack_from(self.data, self.pos)[0]
+            self.pos += DOUBLE.size
+            return value
+        elif tag == Tag.DICT:
+            return dict([ (self.value(), self.value()) for i in xrange(self.varint()) ])
+        raise ValueError("Invalid value in creature file at byte %d" % (self.pos - 1))
+
+    def __iter__(self):
+        while True:
+            if self.pos >= len(self.data):
+                raise ValueError("Creature file is truncated")
+            if ord(self.data[self.pos]) == Tag.END:
+                return
+
+            creature = Creature()
+            try:
+                for key in self.creatureFields:
+                    value = self.value()
+                    if key:
+                        setattr(creature, key, value)
+            except (IndexError, struct.error):
+                raise ValueError("Creature file is truncated")
+            yield creature
+
+# Returns True if the given file is a creature file
+def isCreatureFile(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+# Writes the given creatures to a creature file. The file is replaced once all creatures have been written.
+# Returns the number of creatures written.
+def saveCreatures(path, creatures):
+    with openAtomic(path) as f:
+        writer = CreatureWriter(f)
+        for creature in creatures:
+            writer.write(creature)
+        writer.close()
+    return writer.written
+
+# Returns the creatures of a creature file
+def loadCreatures(path):
+    with open(path, "rb") as f:
+        return list(CreatureReader(f.read()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lists the creatures of a creature file written by parse.py.")
+    parser.add_argument("file", help="creature file")
+    parser.add_argument("--json", action="store_true", help="write the records of the creatures as JSON")
+    args = parser.parse_args()
+
+    # Write the names as UTF-8, also when the output is piped and has no encoding
+    sys.stdout = codecs.getwriter("utf-8")(sys.stdout)
+
+    creatures = loadCreatures(args.file)
+    if args.json:
+        json.dump([ c.toRecord() for c in creatures ], sys.stdout, indent=2)
+        print
+    else:
+        for c in creatures:
+            print "%-40s %s" % (c.name, c.source or "")
+        print len(creatures), "creatures"
@@ -1,6 +1,11 @@
 import re
 import os
-from bs4 import NavigableString
+import codecs
+import urlparse
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from bs4.dammit import EncodingDetector
+
+from log import LOG
 
 class DDBStatnames(object):
     # Abilities
@@ -24,23 +29,268 @@ class DDBStatnames(object):
     LANGUAGES   = "Languages"
     CHALLENGE_RATING = "Challenge"
 
-# Returns the string, but with unicode characters replaced with their ASCII equivalents
+# Compiled regular expressions used while parsing, so they are not looked up for every stat card and ability
+class DDBPatterns(object):
+    # Stat cards
+    METADATA        = re.compile("(?P<size>\w*)\s*(?P<type>.*)\s*(?P<sub>\(.*\))?\s*,\s*(?P<alignment>.*)")
+    HIT_POINTS      = re.compile("(.*)\s*\((.*)\)")
+    CHALLENGE       = re.compile("([0-9/]*?)\s\((.*)\s*XP\)")
+    SPEED           = re.compile("(\d*) ft.(,\s*(.*)\s*)")
+
+    # Abilities. Only descriptions containing WEAPON_ATTACK_TEXT can match WEAPON_ATTACK.
+    WEAPON_ATTACK_TEXT = "Weapon Attack"
+    WEAPON_ATTACK   = re.compile("(\w*) Weapon Attack: ([+-]\d*) to hit, reach (.*?), (.*?)\. Hit: (\d*) \((.*?)\) (\w*) damage\s*(plus (\d*) \((.*)\) (.*) damage)?")
+
+    # Pages
+    SOURCE          = re.compile(".*\s*-\s*(.*)\s*- Rules - Compendium - D&D Beyond")
+    TITLE           = re.compile("<title[^>]*>.*?</title\s*>", re.IGNORECASE | re.DOTALL)
+    # Tags that matter when splitting a page into its stat cards, and the starts of comments
+    STREAM_TAGS     = re.compile("<!--|<(/?)(div|html|head|link|title|script|style)(?=[\s/>])[^>]*>", re.IGNORECASE)
+    # Ends of the elements whose content is not markup
+    STREAM_ENDS     = {
+        "!--"    : re.compile("-->"),
+        "title"  : re.compile("</title\s*>", re.IGNORECASE),
+        "script" : re.compile("</script\s*>", re.IGNORECASE),
+        "style"  : re.compile("</style\s*>", re.IGNORECASE),
+    }
+
+# ASCII equivalents of the typographic characters used by D&D Beyond
+UNICODE_REPLACEMENTS = {
+    # Dashes and minus
+    u"\u2010" : u"-",         # Hyphen
+    u"\u2011" : u"-",         # Non-breaking hyphen
+    u"\u2012" : u"-",         # Figure dash
+    u"\u2013" : u"-",         # En dash
+    u"\u2014" : u"-",         # Em dash
+    u"\u2015" : u"-",         # Horizontal bar
+    u"\u2212" : u"-",         # Minus sign
+
+    # Quotes
+    u"\u2018" : u"'",         # Left single quotation mark
+    u"\u2019" : u"'",         # Right single quotation mark
+    u"\u201a" : u"'",         # Single low-9 quotation mark
+    u"\u201b" : u"'",         # Single high-reversed-9 quotation mark
+    u"\u2032" : u"'",         # Prime
+    u"\u201c" : u"\"",        # Left double quotation mark
+    u"\u201d" : u"\"",        # Right double quotation mark
+    u"\u201e" : u"\"",        # Double low-9 quotation mark
+    u"\u2033" : u"\"",        # Double prime
+
+    # Spaces
+    u"\u00a0" : u" ",         # No-break space
+    u"\u2002" : u" ",         # En space
+    u"\u2003" : u" ",         # Em space
+    u"\u2004" : u" ",         # Three-per-em space
+    u"\u2005" : u" ",         # Four-per-em space
+    u"\u2006" : u" ",         # Six-per-em space
+    u"\u2007" : u" ",         # Figure space
+    u"\u2008" : u" ",         # Punctuation space
+    u"\u2009" : u" ",         # Thin space
+    u"\u200a" : u" ",         # Hair space
+    u"\u202f" : u" ",         # Narrow no-break space
+    u"\u205f" : u" ",         # Medium mathematical space
+
+    # Invisible characters
+    u"\u00ad" : u"",          # Soft hyphen
+    u"\u200b" : u"",          # Zero width space
+    u"\u200c" : u"",          # Zero width non-joiner
+    u"\u200d" : u"",          # Zero width joiner
+    u"\u2060" : u"",          # Word joiner
+    u"\ufeff" : u"",          # Zero width no-break space
+
+    # Ligatures
+    u"\ufb00" : u"ff",
+    u"\ufb01" : u"fi",
+    u"\ufb02" : u"fl",
+    u"\ufb03" : u"ffi",
+    u"\ufb04" : u"ffl",
+    u"\ufb05" : u"st",
+    u"\ufb06" : u"st",
+
+    # Other symbols
+    u"\u00d7" : u"x",         # Multiplication sign
+    u"\u2026" : u"...",       # Horizontal ellipsis
+    u"\u2044" : u"/",         # Fraction slash
+}
+
+# Matches any of the characters in UNICODE_REPLACEMENTS
+UNICODE_PATTERN = re.compile(u"[" + u"".join(UNICODE_REPLACEMENTS.keys()) + u"]")
+
+def unicodeReplacement(match):
+    return UNICODE_REPLACEMENTS[match.group()]
+
+# Returns the string, but with unicode characters replaced with their ASCII equivalents.
+# All characters are replaced in a single pass over the string. Most strings of a stat card contain none of them, and
+# searching for one is cheaper than a substitution without matches, so such strings are returned after the search.
 def replaceUnicode(str):
-    str = str.replace(u"\u2013", "-")
-    str = str.replace(u"\u2014", "-")
-    str = str.replace(u"\u2019", "'")
-    str = str.replace(u"\u2212", "-")
-    str = str.replace(u"\xa0", " ")
-    return str
-
+    str = unicode(str)
+    if not UNICODE_PATTERN.search(str):
+        return str
+    return UNICODE_PATTERN.sub(unicodeReplacement, str)
+
+# Facts about a D&D Beyond page that are the same for all of its stat cards, so they are only looked up once per
+# document instead of once per card
+class DDBDocument(object):
+    def __init__(self, title=None, url=None, source=None):
+        self.title = title
+        self.url = url # Canonical URL of the page, used to resolve relative links
+        # Name of the source book. Taken from the title, unless given.
+        self.source = source or ddbSourceFromTitle(title)
+
+    # Returns the given link of the page as an absolute URL
+    def resolve(self, href):
+        if not href or not self.url:
+            return href
+        return urlparse.urljoin(self.url, href)
+
+    # Returns the document of the given <html> tag. The tag may be None.
+    @staticmethod
+    def fromHTML(html):
+        if not html or not html.head:
+            return DDBDocument()
+
+        head = html.head
+        title = head.title.text if head.title else None
+        link = head.find("link", rel="canonical")
+        return DDBDocument(title, link.get("href") if link else None)
+
+    # Returns the document the card is part of
+    @staticmethod
+    def fromCard(card):
+        return DDBDocument.fromHTML(card.find_parent("html"))
+
+# Returns the name of the source book of the card, taken from the page title.
+# Returns None if the card is not part of a complete HTML document.
 def ddbSource(card):
-    title = card.find_parent("html").head.title
-    m = re.search(".*\s*-\s*(.*)\s*- Rules - Compendium - D&D Beyond", title.text)
+    return DDBDocument.fromCard(card).source
+
+# Returns the name of the source book, given the title of a D&D Beyond compendium page
+def ddbSourceFromTitle(title):
+    if title is None:
+        return None
+    m = DDBPatterns.SOURCE.search(title)
     if m:
         return m.group(1)
     else:
         return None
 
+# Returns the text of the <title> of the given HTML document, or None if there is no title.
+# This works on the raw markup, so the document does not need to be parsed.
+def ddbPageTitle(html):
+    m = DDBPatterns.TITLE.search(html)
+    if not m:
+        return None
+    return BeautifulSoup(m.group(0), "html.parser").title.text
+
+# Splits a stream of HTML into the markup of its stat cards (the Basic-Text-Frame divs), without building a tree
+# of the document. The stream is given as chunks of unicode, and may contain several concatenated documents.
+# Only the markup of the current card is kept in memory.
+# Yields [ DDBDocument of the current document, markup of the card ] for each card, in document order. A new
+# DDBDocument is created for each <html> tag, or for a second <head> without one. Like DDBDocument.fromHTML(), it
+# takes the first title and canonical link of the head. Tags in comments, scripts and styles are ignored.
+def ddbStreamStatCards(chunks):
+    document = DDBDocument()
+    head = False    # True inside the <head> of the current document
+    headed = False  # True once the current document has a head
+    buf = ""
+    pos = 0         # Everything in buf before pos has been scanned
+    start = None    # Start of the current card in buf
+    depth = 0
+
+    chunks = iter(chunks)
+    done = False
+    while not done:
+        chunk = next(chunks, None)
+        if chunk is None:
+            done = True
+        else:
+            buf += chunk
+
+        while True:
+            m = DDBPatterns.STREAM_TAGS.search(buf, pos)
+            if not m:
+                # Do not skip a tag that may be cut off at the end of the chunk
+                last = buf.rfind("<", pos)
+                pos = last if last >= 0 and not done else len(buf)
+                break
+
+            name = m.group(2).lower() if m.group(2) else "!--"
+            closing = bool(m.group(1))
+            end = m.end()
+            if name in DDBPatterns.STREAM_ENDS and not closing:
+                # Skip the content of the element, which may end in a later chunk
+                close = DDBPatterns.STREAM_ENDS[name].search(buf, end)
+                if not close and not done:
+                    pos = m.start()
+                    break
+                end = close.end() if close else len(buf)
+                if name == "title" and head and start is None and document.title is None:
+                    document = DDBDocument(BeautifulSoup(buf[m.start():end], "html.parser").title.text, document.url)
+            elif name == "div":
+                if start is None:
+                    if not closing and "Basic-Text-Frame" in m.group(0):
+                        start = m.start()
+                        depth = 1
+                elif closing:
+                    depth -= 1
+                    if depth == 0:
+                        yield [document, buf[start:end]]
+                        start = None
+                else:
+                    depth += 1
+            elif start is None:
+                if name == "html" and not closing:
+                    document = DDBDocument()
+                    head = headed = False
+                elif name == "head":
+                    if closing:
+                        head = False
+                    else:
+                        if headed:
+                            document = DDBDocument()
+                        head = headed = True
+                elif name == "link" and head and document.url is None and "canonical" in m.group(0).lower():
+                    link = BeautifulSoup(m.group(0), "html.parser").link
+                    if "canonical" in link.get("rel", []):
+                        document.url = link.get("href")
+            pos = end
+
+        # Drop everything that is not part of the current card
+        drop = pos if start is None else start
+        buf = buf[drop:]
+        pos -= drop
+        if start is not None:
+            start = 0
+
+    # Unclosed card at the end of the stream
+    if start is not None:
+        yield [document, buf[start:]]
+
+# Splits the given HTML document into the markup of its stat cards (the Basic-Text-Frame divs), without building
+# a tree of the whole document. Yields the markup of each card, in document order.
+def ddbSplitStatCards(html):
+    for document, card in ddbStreamStatCards([html]):
+        yield card
+
+# Reads the given file in chunks of the given size, and yields them as unicode.
+# The encoding is taken from the byte order mark or the declaration at the start of the file, and defaults to UTF-8.
+def readUnicodeChunks(fp, size=1024*1024):
+    decoder = None
+    while True:
+        data = fp.read(size)
+        if decoder is None:
+            data, encoding = EncodingDetector.strip_byte_order_mark(data)
+            encoding = encoding or EncodingDetector.find_declared_encoding(data, is_html=True) or "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)("replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        if not data:
+            yield decoder.decode("", True)
+            return
+        yield decoder.decode(data)
+
 def ddbCreatureName(card):
     title = card.find("p", "Stat-Block-Styles_Stat-Block-Title")
     return replaceUnicode(title.get_text())
@@ -58,288 +308,279 @@ def ddbImage(card):
             return link["href"]
 
 ##########################################################################################################
-### PARSE STATS
+### STAT CARD WALKER
 ##########################################################################################################
-def ddbParseStats(card):
-    print "\t\tParsing stats..."
+
+# Names of the sections a stat card is divided into
+class DDBSections(object):
+    STATS               = "stats"
+    ABILITIES           = "abilities"
+    SPECIAL_ABILITIES   = "special_abilities"
+    ACTIONS             = "actions"
+    LEGENDARY_ACTIONS   = "legendary_actions"
+    REACTIONS           = "reactions"
+
+# CSS classes of the paragraphs in a stat card
+DDB_METADATA_CLASS  = "Stat-Block-Styles_Stat-Block-Metadata"
+DDB_DATA_CLASSES    = [ "Stat-Block-Styles_Stat-Block-Data", "Stat-Block-Styles_Stat-Block-Data-Last" ]
+DDB_BODY_CLASSES    = [ "Stat-Block-Styles_Stat-Block-Body", "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-" ]
+DDB_HEADING_CLASSES = [ "Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-" ]
+DDB_HANGING_CLASS   = "Stat-Block-Styles_Stat-Block-Hanging"
+DDB_ABILITY_CLASS   = "stat-block-ability-scores-stat"
+DDB_SUBHEAD_CLASS   = "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif"
+DDB_BOLD_CLASS      = "Sans-Serif-Character-Styles_Bold-Sans-Serif"
+
+# Types of the strings that are part of the text of a tag. Comments and the like are not.
+DDB_TEXT_TYPES = ( NavigableString, CData )
+
+# Returns True if the tag has any of the given CSS classes
+def ddbHasClass(tag, classes):
+    for c in tag.get("class", []):
+        if c in classes:
+            return True
+    return False
+
+# Yields all paragraphs and ability score blocks of the card in document order.
+# Paragraphs are not descended into, so every tag of the card is visited at most once.
+def ddbStatCardBlocks(card):
+    for child in card.children:
+        if not isinstance(child, Tag):
+            continue
+        if child.name == "p" or DDB_ABILITY_CLASS in child.get("class", []):
+            yield child
+        else:
+            for block in ddbStatCardBlocks(child):
+                yield block
+
+# Walks through the stat card once and sends every paragraph to the section it belongs to.
+# Returns a dict, mapping each of the DDBSections to the same value the respective ddbParse* helper returns.
+def ddbParseStatCard(card):
+    LOG.debug("\t\tParsing stat card...")
 
     stats = {}
+    metadata = None
+    abilities = {}
+    sections = {
+        DDBSections.SPECIAL_ABILITIES : [],
+        DDBSections.ACTIONS           : [],
+        DDBSections.LEGENDARY_ACTIONS : [],
+        DDBSections.REACTIONS         : [],
+    }
+
+    # Special abilities are listed before the first header. Actions and reactions are the sibling paragraphs of
+    # their header, up to the next sibling header, so scopes maps the id of the parent of an open header to its
+    # section. Legendary actions are the hanging paragraphs that follow their header as siblings.
+    special = True
+    opened = []
+    scopes = {}
+    legendary = None    # Id of the parent of the Legendary Actions header
+
+    # If the paragraphs following an action or reaction are body paragraphs without a name, they continue its
+    # description. This is the case for complex abilities, like the Beholder's Eye Rays, whose descriptions span
+    # several paragraphs. Only the sibling paragraphs of the action can continue it, so continued maps the id of a
+    # parent tag to [ name, desc ] of the action whose description its next paragraphs may continue.
+    continued = {}
+
+    for block in ddbStatCardBlocks(card):
+        if block.name == "p" and id(block.parent) in continued:
+            if ddbHasClass(block, DDB_BODY_CLASSES) and not block.find("span", DDB_SUBHEAD_CLASS):
+                action = continued[id(block.parent)]
+                action[1] = action[1] + replaceUnicode("\n" + block.text)
+                continue
+            del continued[id(block.parent)]
+
+        if block.name != "p":
+            att = block.find("div", "stat-block-ability-scores-heading").string.strip()
+            val = block.find("span", "stat-block-ability-scores-score").string.strip()
+            abilities[att] = val
+
+        elif DDB_METADATA_CLASS in block.get("class", []):
+            if metadata is None:
+                metadata = block.get_text()
+
+        elif ddbHasClass(block, DDB_DATA_CLASSES):
+            att, val = ddbParseStatBlock(block)
+            stats[att] = val
+
+        elif ddbHasClass(block, DDB_HEADING_CLASSES):
+            special = False
+            scopes.pop(id(block.parent), None)
+            section = None
+            if block.string == "Actions" and DDBSections.ACTIONS not in opened:
+                section = DDBSections.ACTIONS
+            elif block.string == "Reactions" and DDBSections.REACTIONS not in opened:
+                section = DDBSections.REACTIONS
+            elif (block.string == "Legendary Actions" and "Stat-Block-Styles_Stat-Block-Heading" in block["class"]
+                    and legendary is None):
+                legendary = id(block.parent)
+            if section:
+                opened.append(section)
+                scopes[id(block.parent)] = section
+
+        elif ddbHasClass(block, DDB_BODY_CLASSES):
+            section = DDBSections.SPECIAL_ABILITIES if special else scopes.get(id(block.parent))
+            if section:
+                nametag = block.find("span", DDB_SUBHEAD_CLASS)
+                if nametag:
+                    name, desc = ddbParseNamedBlock(block, nametag)
+                    sections[section].append([name, replaceUnicode(desc)])
+                    if section != DDBSections.SPECIAL_ABILITIES:
+                        continued[id(block.parent)] = sections[section][-1]
+
+        elif legendary == id(block.parent) and DDB_HANGING_CLASS in block.get("class", []):
+            nametag = block.find("span", DDB_BOLD_CLASS)
+            if nametag:
+                name, desc = ddbParseNamedBlock(block, nametag)
+                sections[DDBSections.LEGENDARY_ACTIONS].append([name, replaceUnicode(desc)])
 
     # Get and split long type information
-    long_type = card.find("p", "Stat-Block-Styles_Stat-Block-Metadata").get_text()
-    m = re.match("(?P<size>\w*)\s*(?P<type>.*)\s*(?P<sub>\(.*\))?\s*,\s*(?P<alignment>.*)", long_type)
-    if m:
-        stats[DDBStatnames.SIZE] = m.group("size")
-        stats[DDBStatnames.TYPE] = m.group("type")
-        stats[DDBStatnames.SUBTYPE] = m.group("sub") if m.group("sub") else ""
-        stats[DDBStatnames.ALIGNMENT] = m.group("alignment")
+    if metadata is None:
+        sections[DDBSections.STATS] = None
     else:
-        print "Unable to parse type!"
-        return None
-
-    # Parse all information from blocks
-    for block in card.find_all("p", {"class": [ "Stat-Block-Styles_Stat-Block-Data", "Stat-Block-Styles_Stat-Block-Data-Last"]} ):
-        # If there is a string here, take it as value
-        string = block.find(text = True, recursive=False)
-        val = string.string if string and string.string else ""
-
-        # Parsing these stats is a major pain in the ass.
-        # Ususally, the attribute name is found in one or more spans with the Bold class, the value is found in
-        # other, non-bold spans or as string.
-        # However, sometimes the header is not bold, or only partially bold. We must account for these bugs manually
-
-        # If we do not find any bold spans, we assume all spans are for the stat name
-        forceHeaderSpan = block.find("span", "Sans-Serif-Character-Styles_Bold-Sans-Serif") == None
-
-        att = ""
-        val = ""
-        isHeader = True
-        for child in block.children:
-            if type(child) is NavigableString:
-                text = unicode(child)
-                isHeader = False
-            else:
-                text = child.get_text()
-            text = replaceUnicode(text)
-
-            if isHeader:
-                if forceHeaderSpan or ("class" in child.attrs and "Sans-Serif-Character-Styles_Bold-Sans-Serif" in child["class"]):
-                    isHeader = True
-                else:
-                    isHeader = False
-
-            if isHeader:
-                att = att + text
-            else:
-                val = val + text
-
-        att = att.strip()
-        val = val.strip()
-
-        # If the given stat name is divided over the header/value pair, properly divides the pair and
-        # return [ proper name, proper value ]. Otherwise, return None
-        def fix(stats, header, value):
-
-            def fix_single_stat(stat, header, value):
-                if header == stat:
-                    return None
-
-                if not stat.startswith(header):
-                    return None
-
-                # Check if the aggregate of header and value contains the stat
-                if stat in att+val:
-                    return [stat, (att+val)[len(stat):].strip()]
-                elif stat in att+" "+val:
-                    return [stat, (att+" "+val)[len(stat):].strip()]
-                else:
-                    return None
-
-            for stat in stats:
-                f = fix_single_stat(stat, header, value)
-                if f:
-                    return f
-
-            return None
-
-        # Fix bugs
-        # Sometimes, "Armor" and "Class" are divided among name and value.
-        f = fix([DDBStatnames.ARMOR_CLASS, DDBStatnames.HIT_POINTS, DDBStatnames.SPEED], att, val)
-        if f:
-            att = f[0]
-            val = f[1]
-
-        stats[att] = val
-
-    return stats
+        type_stats = ddbParseMetadata(metadata)
+        if type_stats:
+            stats.update(type_stats)
+            sections[DDBSections.STATS] = stats
+        else:
+            sections[DDBSections.STATS] = None
+
+    sections[DDBSections.ABILITIES] = abilities
+
+    return sections
+
+# Returns [ name, description ] of a paragraph that starts with the given name tag
+def ddbParseNamedBlock(block, nametag):
+    # Grab name and description
+    name = replaceUnicode(nametag.text.strip())
+
+    LOG.debug("\t\t  >", name)
+    desc = ddbTextWithout(block, nametag).strip() # Get the data without the name tag
+    desc = desc.replace("\n", "") # Remove newlines
+
+    return [name, desc]
+
+# Returns the text of the tag without the text of the given descendant, like get_text() would after extracting the
+# descendant. The tree is not modified, so several threads can read the same tree.
+def ddbTextWithout(tag, descendant):
+    text = []
+    ddbCollectText(tag, descendant, text)
+    return u"".join(text)
+
+# Appends the strings of the tag to the list in document order, skipping the given descendant
+def ddbCollectText(tag, descendant, text):
+    for child in tag.contents:
+        if child is descendant:
+            continue
+        if isinstance(child, Tag):
+            ddbCollectText(child, descendant, text)
+        elif type(child) in DDB_TEXT_TYPES:
+            text.append(child)
 
 
 ##########################################################################################################
-### PARSE ABILITIES
+### PARSE STATS
 ##########################################################################################################
-def ddbParseAbilities(card):
-    print "\t\tParsing abilities..."
-
-    abilities = {}
 
-    for block in card.find_all("div", { "class" : [ "stat-block-ability-scores-stat", "stat-block-ability-scores"] }):
-        # print "BLOCK", block
-        att = block.find("div", "stat-block-ability-scores-heading").string.strip()
-        val = block.find("span", "stat-block-ability-scores-score").string.strip()
+# Parses the size, type, subtype and alignment from the text of the Stat-Block-Metadata paragraph.
+# Returns a dict with these stats, or None if the text cannot be parsed.
+def ddbParseMetadata(long_type):
+    m = DDBPatterns.METADATA.match(long_type)
+    if not m:
+        return None
 
-        abilities[att] = val
+    stats = {}
+    stats[DDBStatnames.SIZE] = m.group("size")
+    stats[DDBStatnames.TYPE] = m.group("type")
+    stats[DDBStatnames.SUBTYPE] = m.group("sub") if m.group("sub") else ""
+    stats[DDBStatnames.ALIGNMENT] = m.group("alignment")
+    return stats
 
-    return abilities
+# Parses a single Stat-Block-Data paragraph and returns [ stat name, value ]
+def ddbParseStatBlock(block):
+    # Parsing these stats is a major pain in the ass.
+    # Ususally, the attribute name is found in one or more spans with the Bold class, the value is found in
+    # other, non-bold spans or as string.
+    # However, sometimes the header is not bold, or only partially bold. We must account for these bugs manually
+
+    # If we do not find any bold spans, we assume all spans are for the stat name
+    forceHeaderSpan = block.find("span", DDB_BOLD_CLASS) == None
+
+    att = ""
+    val = ""
+    isHeader = True
+    for child in block.children:
+        if type(child) is NavigableString:
+            text = unicode(child)
+            isHeader = False
+        else:
+            text = child.get_text()
+        text = replaceUnicode(text)
+
+        if isHeader:
+            if forceHeaderSpan or ("class" in child.attrs and DDB_BOLD_CLASS in child["class"]):
+                isHeader = True
+            else:
+                isHeader = False
 
+        if isHeader:
+            att = att + text
+        else:
+            val = val + text
 
-##########################################################################################################
-### PARSE SPECIAL ABILITIES
-##########################################################################################################
-def ddbParseSpecialAbilities(card):
-    print "\t\tParsing special abilities..."
+    att = att.strip()
+    val = val.strip()
 
-    list = []
+    # If the given stat name is divided over the header/value pair, properly divides the pair and
+    # return [ proper name, proper value ]. Otherwise, return None
+    def fix(stats, header, value):
 
-    # Process all paragraphs until we find a header
-    blocks = card.find_all("p", {'class':["Stat-Block-Styles_Stat-Block-Body", "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-",
-                                          "Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-"]})
-    for block in blocks:
-        nametag = block.find("span", "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif")
-        if nametag:
-            # Grab name and description
-            name = replaceUnicode(nametag.text.strip())
+        def fix_single_stat(stat, header, value):
+            if header == stat:
+                return None
 
-            print "\t\t  >", name
-            nametag.extract() # Temporarily remove the nametag, because it makes parsing easier
-            desc = block.get_text().strip() # Get the data without the name tag
-            desc = desc.replace("\n", "") # Remove newlines
-            block.insert(0, nametag) # Re-add nametag
+            if not stat.startswith(header):
+                return None
 
-            desc = replaceUnicode(desc)
+            # Check if the aggregate of header and value contains the stat
+            if stat in att+val:
+                return [stat, (att+val)[len(stat):].strip()]
+            elif stat in att+" "+val:
+                return [stat, (att+" "+val)[len(stat):].strip()]
+            else:
+                return None
 
-            list.append([name, desc])
-        elif "Stat-Block-Styles_Stat-Block-Heading" in block["class"] \
-                or "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-" in block["class"]:
-            break
+        for stat in stats:
+            f = fix_single_stat(stat, header, value)
+            if f:
+                return f
 
-    return list
+        return None
 
+    # Fix bugs
+    # Sometimes, "Armor" and "Class" are divided among name and value.
+    f = fix([DDBStatnames.ARMOR_CLASS, DDBStatnames.HIT_POINTS, DDBStatnames.SPEED], att, val)
+    if f:
+        att = f[0]
+        val = f[1]
 
-##########################################################################################################
-### PARSE ACTIONS
-##########################################################################################################
-def ddbParseActions(card):
-    print "\t\tParsing actions..."
-
-    list = []
-
-    # Find the "Actions" header
-    header = card.find("p", {'class':["Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-"]},
-                            text = "Actions")
-    if not header:
-        print "\t\t  > No reactions."
-        return list
-
-    # Process all paragraphs until we find a header
-    blocks = header.find_next_siblings("p", {'class':["Stat-Block-Styles_Stat-Block-Body", "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-",
-                                          "Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-"]})
-    for block in blocks:
-        nametag = block.find("span", "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif")
-        if nametag:
-            # Grab name and description
-            name = replaceUnicode(nametag.text.strip())
-
-            print "\t\t  >", name
-            nametag.extract() # Temporarily remove the nametag, because it makes parsing easier
-            desc = block.get_text().strip() # Get the data without the name tag
-            desc = desc.replace("\n", "") # Remove newlines
-            block.insert(0, nametag) # Re-add nametag
-
-            # If the next blocks do not contain a header, we must aggregate them into this ability. This is the case
-            # for complex abilities, like the Beholder's Eye Rays, whose descriptions span several paragraphs.
-            for sibling in block.find_next_siblings("p"):
-                if "class" in sibling.attrs and ("Stat-Block-Styles_Stat-Block-Body" in sibling["class"]
-                    or "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-" in sibling["class"]) \
-                        and not sibling.find("span", "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif"):
-                    desc = desc + "\n" + sibling.text
-                else:
-                    break
+    return [att, val]
 
-            desc = replaceUnicode(desc)
+# The ddbParse* helpers below each return a single section of the card. Use ddbParseStatCard to get all sections
+# at once, since every call walks through the whole card.
+def ddbParseStats(card):
+    return ddbParseStatCard(card)[DDBSections.STATS]
 
-            list.append([name, desc])
-        elif "Stat-Block-Styles_Stat-Block-Heading" in block["class"] \
-                or "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-" in block["class"]:
-            break
+def ddbParseAbilities(card):
+    return ddbParseStatCard(card)[DDBSections.ABILITIES]
 
-    return list
+def ddbParseSpecialAbilities(card):
+    return ddbParseStatCard(card)[DDBSections.SPECIAL_ABILITIES]
 
+def ddbParseActions(card):
+    return ddbParseStatCard(card)[DDBSections.ACTIONS]
 
-##########################################################################################################
-### PARSE LEGENDARY ACTIONS
-##########################################################################################################
 def ddbParseLegendaryActions(card):
-    print "\t\tParsing legendary actions..."
-
-    list = []
-
-    # Find the "Actions" header
-    header = card.find("p", "Stat-Block-Styles_Stat-Block-Heading", text = "Legendary Actions")
-    if not header:
-        print "\t\t  > No legendary actions."
-        return list
-
-    # Process all paragraphs until we find a header
-    blocks = header.find_next_siblings("p", "Stat-Block-Styles_Stat-Block-Hanging")
-    for block in blocks:
-        nametag = block.find("span", "Sans-Serif-Character-Styles_Bold-Sans-Serif")
-        if nametag:
-            # Grab name and description
-            name = replaceUnicode(nametag.text.strip())
-
-            print "\t\t  >", name
-            nametag.extract() # Temporarily remove the nametag, because it makes parsing easier
-            desc = block.get_text().strip() # Get the data without the name tag
-            desc = desc.replace("\n", "") # Remove newlines
-            block.insert(0, nametag) # Re-add nametag
-
-            desc = replaceUnicode(desc)
-
-            list.append([name, desc])
-        elif "Stat-Block-Styles_Stat-Block-Heading" in block["class"] \
-                or "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-" in block["class"]:
-            break
-
-    return list
-
+    return ddbParseStatCard(card)[DDBSections.LEGENDARY_ACTIONS]
 
-##########################################################################################################
-### PARSE REACTIONS
-##########################################################################################################
 def ddbParseReactions(card):
-    print "\t\tParsing reactions..."
-
-    list = []
-
-    # Find the "Actions" header
-    header = card.find("p", {'class':["Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-"]},
-                       text = "Reactions")
-    if not header:
-        print "\t\t  > No reactions."
-        return list
-
-    # Process all paragraphs until we find a header
-    blocks = header.find_next_siblings("p", {'class':["Stat-Block-Styles_Stat-Block-Body", "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-",
-                                                      "Stat-Block-Styles_Stat-Block-Heading", "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-"]})
-    for block in blocks:
-        nametag = block.find("span", "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif")
-        if nametag:
-            # Grab name and description
-            name = replaceUnicode(nametag.text.strip())
-
-            print "\t\t  >", name
-            nametag.extract() # Temporarily remove the nametag, because it makes parsing easier
-            desc = block.get_text().strip() # Get the data without the name tag
-            desc = desc.replace("\n", "") # Remove newlines
-            block.insert(0, nametag) # Re-add nametag
-
-            # If the next blocks do not contain a header, we must aggregate them into this ability. This is the case
-            # for complex abilities, like the Beholder's Eye Rays, whose descriptions span several paragraphs.
-            for sibling in block.find_next_siblings("p"):
-                if "class" in sibling.attrs and ("Stat-Block-Styles_Stat-Block-Body" in sibling["class"]
-                                                 or "Stat-Block-Styles_Stat-Block-Body-Last--apply-before-heading-" in sibling["class"]) \
-                        and not sibling.find("span", "Sans-Serif-Character-Styles_Inline-Subhead-Sans-Serif"):
-                    desc = desc + "\n" + sibling.text
-                else:
-                    break
-
-            desc = replaceUnicode(desc)
-
-            list.append([name, desc])
-        elif "Stat-Block-Styles_Stat-Block-Heading" in block["class"] \
-                or "Stat-Block-Styles_Stat-Block-Heading--after-last-bar-" in block["class"]:
-            break
-
-
-    return list
-
+    return ddbParseStatCard(card)[DDBSections.REACTIONS]
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import socket
+import httplib
+import threading
+import urlparse
+from email.utils import formatdate
+
+from fileutil import writeAtomic
+from log import LOG
+from profiling import PROFILER
+
+# Status of a single download
+class DownloadStatus(object):
+    DOWNLOADED  = "downloaded"
+    UNCHANGED   = "unchanged"
+    FAILED      = "failed"
+
+# Downloads files over HTTP(S) with a fixed number of worker threads.
+# Every worker keeps one connection per host open, so consecutive downloads from the same server reuse the
+# connection instead of doing a new TCP and TLS handshake. Failed requests are retried with an exponential backoff.
+# Files are written to a temporary file and renamed when complete, so an interrupted download never leaves a
+# partial file behind.
+# The ETag of every downloaded file is stored in an index file, so existing files are only downloaded again if
+# they changed on the server.
+class Downloader(object):
+    REDIRECTS       = [ 301, 302, 303, 307, 308 ]
+    RETRY_STATUS    = [ 408, 429, 500, 502, 503, 504 ]
+    MAX_REDIRECTS   = 5
+
+    def __init__(self, etagfile=None, concurrency=8, retries=3, backoff=1.0, timeout=30):
+        self.etagfile = etagfile
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+        self.etags = {}
+        if etagfile and os.path.isfile(etagfile):
+            with open(etagfile) as f:
+                self.etags = json.load(f)
+
+    # Downloads all given [ url, output file ] pairs. The pairs may be given by a generator, which is read by the
+    # workers as they become idle, so downloads start while the generator is still producing pairs.
+    # Returns a dict, mapping each output file to its DownloadStatus. An error raised by the generator is raised
+    # again once the running downloads are done.
+    def download(self, files):
+        threads = self.concurrency
+        if isinstance(files, (list, tuple)):
+            threads = min(threads, len(files))
+        files = iter(files)
+        reading = threading.Lock()
+
+        results = {}
+        errors = []
+
+        def work():
+            connections = {}
+            try:
+                while True:
+                    with reading:
+                        try:
+                            url, outfile = next(files)
+                        except StopIteration:
+                            return
+                        except BaseException:
+                            errors.append(sys.exc_info())
+                            return
+
+                    status = self.fetch(connections, url, outfile)
+                    with self.lock:
+                        results[outfile] = status
+            finally:
+                for connection in connections.values():
+                    connection.close()
+
+        threads = [ threading.Thread(target=PROFILER.profiled(work)) for i in range(threads) ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.saveETags()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return results
+
+    # Downloads a single file, retrying failed requests. Returns the DownloadStatus.
+    def fetch(self, connections, url, outfile):
+        # Only download existing files if they changed on the server
+        headers = { "User-Agent" : "compendium" }
+        if os.path.isfile(outfile):
+            with self.lock:
+                etag = self.etags.get(outfile)
+            if etag:
+                headers["If-None-Match"] = etag
+            headers["If-Modified-Since"] = formatdate(os.path.getmtime(outfile), usegmt=True)
+
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt-1))
+
+            try:
+                response, body = self.request(connections, url, headers)
+            except (socket.error, httplib.HTTPException) as e:
+                LOG.warning("\t\tRequest for", url, "failed:", e)
+                continue
+
+            if response.status == 304:
+                return DownloadStatus.UNCHANGED
+            elif response.status == 200:
+                writeAtomic(outfile, body)
+                with self.lock:
+                    etag = response.getheader("etag")
+                    if etag:
+                        self.etags[outfile] = etag
+                    else:
+                        self.etags.pop(outfile, None)
+                return DownloadStatus.DOWNLOADED
+            elif response.status in Downloader.RETRY_STATUS:
+                LOG.warning("\t\tRequest for", url, "failed with status", response.status)
+            else:
+                LOG.warning("\t\tUnable to download", url+":", response.status, response.reason)
+                return DownloadStatus.FAILED
+
+        return DownloadStatus.FAILED
+
+    # Sends a GET request for the url over a pooled connection, following redirects.
+    # Returns [ response, body ].
+    def request(self, connections, url, headers):
+        for i in range(Downloader.MAX_REDIRECTS + 1):
+            parts = urlparse.urlsplit(url)
+            path = parts.path or "/"
+            if parts.query:
+                path = path + "?" + parts.query
+
+            key = (parts.scheme, parts.netloc)
+            reused = key in connections
+            if not reused:
+                if parts.scheme == "https":
+                    connections[key] = httplib.HTTPSConnection(parts.netloc, timeout=self.timeout)
+                else:
+                    connections[key] = httplib.HTTPConnection(parts.netloc, timeout=self.timeout)
+            connection = connections[key]
+
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (socket.error, httplib.HTTPException):
+                connection.close()
+                del connections[key]
+                # The server may have closed an idle connection. Retry once on a new one.
+                if reused:
+                    continue
+                raise
+
+            if response.getheader("connection", "").lower() == "close":
+                connection.close()
+                del connections[key]
+
+            if response.status in Downloader.REDIRECTS and response.getheader("location"):
+                url = urlparse.urljoin(url, response.getheader("location"))
+                continue
+
+            return [response, body]
+
+        raise httplib.HTTPException("Too many redirects for " + url)
+
+    # Writes the ETags of all downloaded files to the index file
+    def saveETags(self):
+        if not self.etagfile:
+            return
+
+        with self.lock:
+            data = json.dumps(self.etags, indent=2, sort_keys=True)
+        writeAtomic(self.etagfile, data)
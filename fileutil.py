@@ -0,0 +1,23 @@
+import os
+import tempfile
+import contextlib
+
+# Opens a temporary file next to path for writing, and renames it to path once the with block is left.
+# Readers of path therefore either see the old or the new file, never a partially written one.
+@contextlib.contextmanager
+def openAtomic(path):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp, 0644)
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+# Writes the data to path atomically
+def writeAtomic(path, data):
+    with openAtomic(path) as f:
+        f.write(data)
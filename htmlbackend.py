@@ -0,0 +1,90 @@
+from bs4 import BeautifulSoup, UnicodeDammit
+
+from ddbhelper import DDBDocument
+
+# Base class of the HTML parser backends.
+# A backend builds the tree of a D&D Beyond page and finds its stat cards. The cards are always returned as
+# BeautifulSoup tags, so the same extraction logic in ddbhelper runs on every backend.
+class HTMLBackend(object):
+    name = None
+
+    # Returns True if all libraries needed by the backend are installed
+    @staticmethod
+    def available():
+        return True
+
+    # Parses the given document and returns [ DDBDocument, list of stat cards ]
+    def parse(self, markup):
+        raise NotImplementedError()
+
+    # Parses the markup of a single stat card and returns the card
+    def parseCard(self, markup):
+        raise NotImplementedError()
+
+# Builds a BeautifulSoup tree of the whole document with the given tree builder
+class SoupBackend(HTMLBackend):
+    builder = None
+
+    def parse(self, markup):
+        soup = BeautifulSoup(markup, self.builder)
+        cards = soup.select('div[class*="Basic-Text-Frame"]')
+        return [DDBDocument.fromHTML(soup.html), cards]
+
+    def parseCard(self, markup):
+        return BeautifulSoup(markup, self.builder).div
+
+# Pure Python parser of the standard library. Always available, but slow.
+class HTMLParserBackend(SoupBackend):
+    name = "html.parser"
+    builder = "html.parser"
+
+# BeautifulSoup on top of the lxml tree builder
+class LXMLBackend(SoupBackend):
+    name = "lxml"
+    builder = "lxml"
+
+    @staticmethod
+    def available():
+        try:
+            import lxml
+            return True
+        except ImportError:
+            return False
+
+# Builds the tree of the whole document with lxml and selects the stat cards in C. Only the stat cards are
+# turned into BeautifulSoup trees, so the rest of the page never passes through BeautifulSoup.
+class LXMLSelectBackend(LXMLBackend):
+    name = "lxml-select"
+
+    def parse(self, markup):
+        import lxml.html
+
+        # Without a declared encoding, lxml would assume latin-1. Let BeautifulSoup detect it instead.
+        if isinstance(markup, str):
+            markup = UnicodeDammit(markup, is_html=True).unicode_markup
+
+        tree = lxml.html.fromstring(markup)
+        links = tree.xpath('//head/link[@rel="canonical"]/@href')
+        document = DDBDocument(tree.findtext("head/title"), links[0] if links else None)
+
+        cards = []
+        for div in tree.xpath('//div[contains(@class, "Basic-Text-Frame")]'):
+            cards.append(self.parseCard(lxml.html.tostring(div, encoding="unicode", with_tail=False)))
+        return [document, cards]
+
+# All backends, from the fastest to the slowest
+BACKENDS = [ LXMLSelectBackend, LXMLBackend, HTMLParserBackend ]
+
+# Returns the names of all installed backends
+def availableBackends():
+    return [ backend.name for backend in BACKENDS if backend.available() ]
+
+# Returns an instance of the backend with the given name. If no name is given, returns the fastest installed backend.
+def getBackend(name=None):
+    for backend in BACKENDS:
+        if (name is None or backend.name == name) and backend.available():
+            return backend()
+
+    if name is None:
+        return HTMLParserBackend()
+    raise ValueError("HTML backend " + name + " is not available")
@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import threading
+import collections
+
+# Held while a line is written, so the lines of threads logging at the same time are not mixed
+LOCK = threading.Lock()
+
+# Levels of log messages. A message is written if its level is at least the level of the log.
+class LogLevel(object):
+    DEBUG   = 10    # Every creature and ability parsed
+    INFO    = 20    # Stages of the import and their results
+    WARNING = 30    # Problems that do not stop the import
+    ERROR   = 40
+
+# Writes messages of the import to standard output.
+# Messages are given like the arguments of a print statement, and are only joined if their level is enabled, so
+# disabled messages cost no more than the call. Each message is written as a whole line with a single write.
+class Log(object):
+    def __init__(self, level=LogLevel.INFO, stream=None):
+        self.level = level
+        self.stream = stream    # Standard output at the time of writing if None
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, *args):
+        if level < self.level:
+            return
+        stream = self.stream or sys.stdout
+        encoding = getattr(stream, "encoding", None) or "utf-8"
+        line = []
+        for arg in args:
+            text = arg.encode(encoding, "replace") if isinstance(arg, unicode) else str(arg)
+            # Like print, no space is put after text that ends in whitespace other than a space
+            if line and not (line[-1][-1:].isspace() and line[-1][-1:] != " "):
+                line.append(" ")
+            line.append(text)
+        line.append("\n")
+        with LOCK:
+            stream.write("".join(line))
+
+    def debug(self, *args):
+        self.log(LogLevel.DEBUG, *args)
+
+    def info(self, *args):
+        self.log(LogLevel.INFO, *args)
+
+    def warning(self, *args):
+        self.log(LogLevel.WARNING, *args)
+
+    def error(self, *args):
+        self.log(LogLevel.ERROR, *args)
+
+# Counts the cards of a stage and shows the count on a single line of the terminal.
+# The count is only written at info level, and not at debug level, where every card is logged anyway. If the
+# output is not a terminal, only the final count is written.
+class Progress(object):
+    def __init__(self, label, total=None, log=None, interval=0.2):
+        self.label = label
+        self.total = total
+        self.log = log or LOG
+        self.interval = interval    # Minimum time between two updates of the line in seconds
+        self.count = 0
+        self.shown = 0
+        stream = self.log.stream or sys.stdout
+        self.live = self.log.level == LogLevel.INFO and hasattr(stream, "isatty") and stream.isatty()
+
+    def line(self):
+        if self.total is None:
+            return "%s: %d" % (self.label, self.count)
+        return "%s: %d/%d" % (self.label, self.count, self.total)
+
+    def step(self, n=1):
+        self.count += n
+        if self.live and time.time() - self.shown >= self.interval:
+            self.shown = time.time()
+            stream = self.log.stream or sys.stdout
+            with LOCK:
+                stream.write("\r" + self.line())
+                stream.flush()
+
+    # Writes the final count
+    def done(self):
+        if self.live:
+            (self.log.stream or sys.stdout).write("\r")
+        self.log.info(self.line())
+
+# Collects the stat cards that could not be parsed, so they can be reported together after the import.
+# The file being parsed is set by the caller, as the parsing helpers only see the cards.
+class ErrorReport(object):
+    def __init__(self, log=None):
+        self.log = log or LOG
+        self.errors = []    # Dicts of file, creature, message and detail
+        self.file = None
+
+    # Records that the card of the given creature could not be parsed
+    def add(self, creature, message, detail=None):
+        error = collections.OrderedDict([
+            ("file",     self.file),
+            ("creature", creature),
+            ("message",  message),
+            ("detail",   detail),
+        ])
+        self.errors.append(error)
+        if self.log.enabled(LogLevel.DEBUG):
+            self.log.debug("\t" + message + "!")
+
+    # Adds errors collected by another process
+    def extend(self, errors):
+        self.errors.extend(errors)
+
+    # Removes and returns all errors
+    def take(self):
+        errors, self.errors = self.errors, []
+        return errors
+
+    # Logs the number of errors of every kind, followed by the cards
+    def summary(self):
+        if not self.errors:
+            return
+        self.log.warning("###", len(self.errors), "cards could not be parsed")
+        for message, count in collections.Counter([ e["message"] for e in self.errors ]).most_common():
+            self.log.warning("\t" + message + ":", count)
+        for e in self.errors:
+            self.log.warning("\t\t" + (e["file"] or "?") + ":", e["creature"] or "?", "-", e["message"] +
+                             (" (" + e["detail"] + ")" if e["detail"] else ""))
+
+    # Writes all errors to the given file as JSON
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump({ "errors" : self.errors }, f, indent=2)
+
+# Log of the running import
+LOG = Log()
+
+# Parse errors of the running import
+ERRORS = ErrorReport()
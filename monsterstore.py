@@ -0,0 +1,259 @@
+#!/bin/python2
+
+import os
+import re
+import sys
+import json
+import codecs
+import sqlite3
+import argparse
+import cPickle as pickle
+
+from creature import Creature
+
+# File name of the store. parse.py keeps the store next to the compendium it writes.
+STORE_NAME = "monsters.sqlite"
+
+# Words of ability texts that are not indexed, because nearly every ability contains them
+STOP_WORDS = frozenset([ "a", "an", "and", "as", "at", "be", "by", "for", "from", "if", "in", "is", "it", "its", "of",
+                         "on", "or", "that", "the", "to", "with" ])
+
+WORD = re.compile("[a-z0-9]+")
+TYPE = re.compile(r"^\s*(.*?)\s*\((.*)\)\s*$")
+
+# Returns [ type, subtype ] of a creature. The parser leaves the subtype in the type, like "dragon (shapechanger)",
+# so it is split off here.
+def splitType(type, subtype):
+    m = TYPE.match(type or "")
+    if m and not subtype:
+        return [ m.group(1), m.group(2) ]
+    return [ type, subtype ]
+
+# Returns the words of the text that are indexed, prefixed with the given field
+def indexWords(text, field=""):
+    return [ field + word for word in WORD.findall(text.lower()) if word not in STOP_WORDS ]
+
+# Returns the set of index terms of an ability. The words of the name and description are indexed as they are.
+# The words of the name, attack type and damage types are indexed with the prefixes name:, attack: and damage: as
+# well, so they can be searched on their own.
+def abilityTerms(ability):
+    terms = set(indexWords(ability.name) + indexWords(ability.name, "name:") + indexWords(ability.desc))
+    for damage_type in [ ability.damage_type, ability.secondary_damage_type ]:
+        if damage_type:
+            terms.update(indexWords(damage_type, "damage:"))
+    if ability.attack_type:
+        terms.update(indexWords(ability.attack_type, "attack:"))
+    return terms
+
+# Returns the text with the wildcards of LIKE patterns escaped with \
+def escapeLike(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# Returns the set of index terms of a search text, like "pack tactics" or "damage:necrotic"
+def searchTerms(text):
+    terms = set()
+    for token in text.split():
+        field, sep, words = token.rpartition(":")
+        terms.update(indexWords(words, field.lower() + sep))
+    return terms
+
+# Local database of parsed creatures.
+# Every creature is stored as its record, next to the columns it can be searched by, so monsters can be filtered
+# without parsing the pages or loading the compendium again. A creature replaces the one of the same name, like in the
+# compendium, also if its source changed.
+# The texts of the abilities are kept in an inverted index, which maps every term to the abilities that contain it,
+# given by the rowid of their creature and their position in the list of all of its abilities.
+class MonsterStore(object):
+    COLUMNS = [ "name", "source", "challenge_rating", "type", "subtype", "size", "alignment" ]
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.db = sqlite3.connect(path)
+        # Names, types, sizes and sources are compared without case. This also lets SQLite search the prefixes
+        # given to query() in the indexes.
+        self.db.execute("CREATE TABLE IF NOT EXISTS monsters (name TEXT NOT NULL COLLATE NOCASE, "
+                        "source TEXT COLLATE NOCASE, challenge_rating REAL, type TEXT COLLATE NOCASE, "
+                        "subtype TEXT COLLATE NOCASE, size TEXT COLLATE NOCASE, alignment TEXT, record BLOB NOT NULL, "
+                        "PRIMARY KEY (name, source))")
+        for column in [ "name", "challenge_rating", "type", "size", "source" ]:
+            self.db.execute("CREATE INDEX IF NOT EXISTS monsters_%s ON monsters (%s)" % (column, column))
+        self.db.execute("CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, monster INTEGER NOT NULL, "
+                        "ability INTEGER NOT NULL, PRIMARY KEY (term, monster, ability)) WITHOUT ROWID")
+        self.db.execute("CREATE INDEX IF NOT EXISTS postings_monster ON postings (monster)")
+
+    # Stores all given creatures in a single transaction, and indexes their abilities. Returns the number of
+    # creatures stored.
+    def putAll(self, creatures):
+        insert = "INSERT INTO monsters (%s, record) VALUES (%s)" % (
+            ", ".join(MonsterStore.COLUMNS), ", ".join([ "?" ] * (len(MonsterStore.COLUMNS)+1)))
+
+        count = 0
+        with self.db:
+            for creature in creatures:
+                record = creature.toRecord()
+                data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+                row = [ record[column] for column in MonsterStore.COLUMNS ]
+                row[1] = row[1] or ""   # Creatures without a source are replaced like the others
+                row[3:5] = splitType(row[3], row[4])
+
+                # The replaced creature gets a new rowid, so its abilities are removed from the index first
+                self.db.execute("DELETE FROM postings WHERE monster IN (SELECT rowid FROM monsters WHERE name = ?)",
+                                row[:1])
+                self.db.execute("DELETE FROM monsters WHERE name = ?", row[:1])
+                rowid = self.db.execute(insert, row + [ sqlite3.Binary(data) ]).lastrowid
+                self.index(rowid, creature)
+                count += 1
+        return count
+
+    # Stores a single creature
+    def put(self, creature):
+        self.putAll([ creature ])
+
+    # Adds the abilities of the creature stored with the given rowid to the index
+    def index(self, rowid, creature):
+        abilities = creature.special_abilities + creature.actions + creature.legendary_actions + creature.reactions
+        self.db.executemany("INSERT OR IGNORE INTO postings (term, monster, ability) VALUES (?, ?, ?)",
+                            [ (term, rowid, i) for i, ability in enumerate(abilities) for term in abilityTerms(ability) ])
+
+    # Rebuilds the index from the stored creatures
+    def reindex(self):
+        with self.db:
+            self.db.execute("DELETE FROM postings")
+            for rowid, data in self.db.execute("SELECT rowid, record FROM monsters").fetchall():
+                self.index(rowid, Creature.fromRecord(pickle.loads(str(data))))
+
+    # Yields the creatures matching all given filters, ordered by challenge rating and name.
+    # Names and sources match if they start with the given text, in which % and _ are matched like any other character,
+    # and types and sizes if they are equal. Types stored before subtypes were split off, like "dragon (shapechanger)",
+    # match their type as well. Case is ignored. The challenge rating is matched from cr_min to cr_max, both included.
+    # If an ability text is given, one of the abilities of the creature must contain all of its terms (see
+    # searchTerms()). An ability text without any terms, like "the", matches no creature.
+    def query(self, name=None, cr_min=None, cr_max=None, type=None, size=None, source=None, limit=None, ability=None):
+        where = []
+        params = []
+        for clause, value in [ ("name LIKE ? || '%' ESCAPE '\\'", name and escapeLike(name)),
+                               ("challenge_rating >= ?", cr_min), ("challenge_rating <= ?", cr_max), ("size = ?", size),
+                               ("source LIKE ? || '%' ESCAPE '\\'", source and escapeLike(source)) ]:
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if type is not None:
+            where.append("(type = ? OR type LIKE ? || ' (%' ESCAPE '\\')")
+            params.extend([ type, escapeLike(type) ])
+
+        terms = sorted(searchTerms(ability)) if ability is not None else []
+        if ability is not None and not terms:
+            return
+        if terms:
+            # Every further term must be found in the same ability as the first one
+            sql = "SELECT p0.monster FROM postings p0"
+            for i in range(1, len(terms)):
+                sql += " JOIN postings p%d ON p%d.monster = p0.monster AND p%d.ability = p0.ability" % (i, i, i)
+            sql += " WHERE " + " AND ".join([ "p%d.term = ?" % i for i in range(len(terms)) ])
+            where.append("rowid IN (" + sql + ")")
+            params.extend(terms)
+
+        sql = "SELECT record FROM monsters"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY challenge_rating, name"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        for row in self.db.execute(sql, params):
+            yield Creature.fromRecord(pickle.loads(str(row[0])))
+
+    # Returns the number of stored creatures
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM monsters").fetchone()[0]
+
+    # Removes all creatures
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM monsters")
+            self.db.execute("DELETE FROM postings")
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+# Returns [ min, max ] of a challenge rating range like "5-8", "1/4" or "10-"
+def parseChallengeRange(text):
+    def rating(value):
+        if not value:
+            return None
+        if "/" in value:
+            numerator, denominator = value.split("/", 1)
+            return float(numerator) / float(denominator)
+        return float(value)
+
+    if "-" in text:
+        low, high = text.split("-", 1)
+        return [ rating(low.strip()), rating(high.strip()) ]
+    return [ rating(text.strip()) ] * 2
+
+# Returns the challenge rating as it is written in stat cards
+def formatChallenge(cr):
+    if cr is None:
+        return "?"
+    if 0 < cr < 1:
+        return "1/" + str(int(round(1 / cr)))
+    return str(int(cr))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Searches the creatures stored by parse.py.")
+    parser.add_argument("--store", default=None,
+                        help="database file (default: the store next to the compendium written by parse.py)")
+    parser.add_argument("--name", default=None, help="start of the name")
+    parser.add_argument("--cr", default=None, help="challenge rating or range, like 5, 1/4, 5-8 or 10-")
+    parser.add_argument("--type", default=None, help="creature type, like undead")
+    parser.add_argument("--size", default=None, help="size, like Large")
+    parser.add_argument("--source", default=None, help="start of the source book, like \"Volo's\"")
+    parser.add_argument("--ability", default=None,
+                        help="words one ability must contain, like \"pack tactics\", name:tactics, damage:necrotic or attack:ranged")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the index of the abilities first")
+    parser.add_argument("--limit", type=int, default=None, help="maximum number of creatures listed")
+    parser.add_argument("--json", action="store_true", help="write the records of the creatures as JSON")
+    args = parser.parse_args()
+
+    # Read the filters and write the output as UTF-8, also when the output is piped and has no encoding
+    for key in [ "name", "type", "size", "source", "ability" ]:
+        if getattr(args, key) is not None:
+            setattr(args, key, getattr(args, key).decode("utf-8"))
+    sys.stdout = codecs.getwriter("utf-8")(sys.stdout)
+
+    if args.store is None:
+        from parse import storefile
+        args.store = storefile
+
+    if not os.path.isfile(args.store):
+        print "No store found at", args.store
+        exit(1)
+
+    if args.ability is not None and not searchTerms(args.ability):
+        print "Only words that are not indexed given to --ability:", args.ability
+        exit(1)
+
+    cr_min, cr_max = parseChallengeRange(args.cr) if args.cr else [ None, None ]
+
+    store = MonsterStore(args.store)
+    try:
+        if args.reindex:
+            store.reindex()
+        creatures = store.query(args.name, cr_min, cr_max, args.type, args.size, args.source, args.limit, args.ability)
+        if args.json:
+            json.dump([ c.toRecord() for c in creatures ], sys.stdout, indent=2)
+            print
+        else:
+            found = 0
+            for c in creatures:
+                print "%-6s %-32s %-10s %-24s %s" % (formatChallenge(c.challenge_rating), c.name, c.size,
+                                                      (c.type or "") + (" (" + c.subtype + ")" if c.subtype else ""), c.source or "")
+                found += 1
+            print found, "of", store.count(), "creatures"
+    finally:
+        store.close()
@@ -0,0 +1,165 @@
+#!/bin/python2
+
+import os
+import sys
+import json
+import mmap
+import codecs
+import hashlib
+import argparse
+import collections
+
+from compendium import scanLayout
+from fileutil import writeAtomic
+
+# Default folder of the indexes of packs
+DEFAULT_FOLDER = os.path.join(os.path.expanduser("~"), ".cache", "compendium", "packs")
+
+# Returns the default index file of the given pack
+def indexPath(path):
+    return os.path.join(DEFAULT_FOLDER, hashlib.sha1(os.path.abspath(path)).hexdigest() + ".json")
+
+# Writes the index of the given pack, with the layout of its monsters as scanLayout() returns it. The pack must not
+# have changed since the layout was taken, like right after MonsterPack.save().
+def writeIndex(path, layout, indexfile=None):
+    indexfile = indexfile or indexPath(path)
+    stat = os.stat(path)
+    folder = os.path.dirname(indexfile)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    start, end, entries = layout
+    writeAtomic(indexfile, json.dumps({ "version" : PackIndex.VERSION, "size" : stat.st_size, "mtime" : stat.st_mtime,
+                                        "start" : start, "end" : end, "entries" : entries }))
+
+# Random access to the monsters of a compendium pack.
+# The pack is scanned once for the byte offsets of its entries in content.Monsters.data, keyed by name and source,
+# without decoding them. The offsets are kept in an index file and used again until the size or the modification
+# time of the pack changes. The pack itself is memory-mapped, and only the entries looked up are decoded, so a single
+# monster is found in a large pack without reading the whole file.
+# parse.py reads the layout of the compendium from its index as well, instead of scanning it, and writes the index
+# again whenever it saves the compendium.
+class PackIndex(object):
+    # Version of the index file. Older index files are rebuilt.
+    VERSION = 2
+
+    def __init__(self, path, indexfile=None):
+        self.path = path
+        self.indexfile = indexfile or indexPath(path)
+
+        stat = os.stat(path)
+        layout = self.read(stat)
+        if layout is None:
+            layout = self.build()
+
+        # Each entry is [ name, source, start, end ]
+        self.start, self.end, entries = layout
+        self.entries = entries
+        self.bySource = {}
+        self.byName = {}
+        for entry in entries:
+            self.bySource.setdefault((entry[0], entry[1]), entry)
+            self.byName.setdefault(entry[0], []).append(entry)
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else ""
+
+    # Returns the layout of the index file, or None if there is none or the pack has changed since it was written
+    def read(self, stat):
+        try:
+            with open(self.indexfile, "rb") as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        if (index.get("version") != PackIndex.VERSION or index.get("size") != stat.st_size or
+                index.get("mtime") != stat.st_mtime):
+            return None
+        return [index["start"], index["end"], index["entries"]]
+
+    # Scans the pack for its layout and writes the index file
+    def build(self):
+        with open(self.path, "rb") as f:
+            layout = scanLayout(f.read())
+        writeIndex(self.path, layout, self.indexfile)
+        return layout
+
+    # Returns the layout of the monsters of the pack, like scanLayout()
+    def layout(self):
+        return [self.start, self.end, self.entries]
+
+    # Returns True if the pack contains a monster with the given name
+    def __contains__(self, name):
+        return name in self.byName
+
+    # Returns the number of monsters in the pack
+    def __len__(self):
+        return len(self.entries)
+
+    # Returns the names of all monsters, in the order of the pack
+    def names(self):
+        return [ entry[0] for entry in self.entries ]
+
+    # Returns [ name, source, start, end ] of the monster with the given name and source, or of the first one with the
+    # given name if no source is given. Returns None if there is no such monster.
+    def find(self, name, source=None):
+        if source is not None:
+            return self.bySource.get((name, source))
+        entries = self.byName.get(name)
+        return entries[0] if entries else None
+
+    # Returns the JSON text of the given monster, or None if there is no such monster
+    def text(self, name, source=None):
+        entry = self.find(name, source)
+        return self.map[entry[2]:entry[3]] if entry else None
+
+    # Returns the decoded entry of the given monster, or None if there is no such monster
+    def get(self, name, source=None):
+        text = self.text(name, source)
+        return json.loads(text, object_pairs_hook=collections.OrderedDict) if text is not None else None
+
+    def close(self):
+        if self.map:
+            self.map.close()
+        self.file.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Looks up monsters of a compendium pack without loading all of it.")
+    parser.add_argument("pack", help="compendium pack")
+    parser.add_argument("names", nargs="*", help="names of the monsters")
+    parser.add_argument("--source", default=None, help="source book of the monsters")
+    parser.add_argument("--index", default=None, help="index file (default: in %s)" % DEFAULT_FOLDER)
+    parser.add_argument("--json", action="store_true", help="write the entries of the monsters as JSON")
+    parser.add_argument("--list", action="store_true", help="list the names and sources of all monsters")
+    args = parser.parse_args()
+
+    # Names are unicode. Read the arguments and write the output as UTF-8, also when the output is piped and has no
+    # encoding.
+    source = args.source.decode("utf-8") if args.source is not None else None
+    sys.stdout = codecs.getwriter("utf-8")(sys.stdout)
+    sys.stderr = codecs.getwriter("utf-8")(sys.stderr)
+
+    index = PackIndex(args.pack, args.index)
+    try:
+        if args.list:
+            for entry in index.entries:
+                print "%-40s %s" % (entry[0], entry[1] or "")
+            print len(index), "monsters"
+
+        missing = 0
+        for name in args.names:
+            name = name.decode("utf-8")
+            if args.json:
+                text = index.text(name, source)
+                if text is not None:
+                    print text.decode("utf-8")
+            else:
+                entry = index.find(name, source)
+                if entry:
+                    print "%-40s %-32s bytes %d-%d" % (entry[0], entry[1] or "", entry[2], entry[3])
+            if index.find(name, source) is None:
+                print >>sys.stderr, "Not found:", name
+                missing += 1
+    finally:
+        index.close()
+
+    exit(1 if missing else 0)
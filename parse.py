@@ -1,13 +1,25 @@
 #!/bin/python2
 
 import os
-import re
-import json
-import sys
-from bs4 import BeautifulSoup
+import time
+import argparse
+import traceback
+import multiprocessing
 import collections
 
-from creature import Creature
+import ddbhelper
+from creature import Ability, Creature
+from htmlbackend import availableBackends, getBackend
+from parsecache import ParseCache
+from downloader import Downloader, DownloadStatus
+from compendium import MonsterEncoder, MonsterPack, ShardBy, ShardedPack
+from packindex import PackIndex, writeIndex
+from monsterstore import MonsterStore, STORE_NAME
+from creaturefile import EXTENSION, isCreatureFile, loadCreatures, saveCreatures
+from ddbhelper import ddbStreamStatCards, readUnicodeChunks
+from profiling import PROFILER
+from log import LOG, ERRORS, LogLevel, Progress
+from pipeline import Pipeline
 
 # The input HTML file downloaded from D&D beyond
 infile = "/home/marc/Downloads/creatures.html"
@@ -19,80 +31,555 @@ outdir = "/run/user/1000/gvfs/smb-share:server=192.168.178.34,share=steamapps/GM
 outimagedir = os.path.join(outdir, "custom", "monsters")
 outcompendium = os.path.join(outdir, "packs", "comp.json")
 
-def addToCompendium(creatures):
-    with open(incompendium, "r") as f:
-        comp = json.load(f, object_pairs_hook=collections.OrderedDict)
+# Cache of parsed stat cards
+cachefile = os.path.join(os.path.expanduser("~"), ".cache", "compendium", "cards.sqlite")
 
-    print "Read compendium"
+# Database of all parsed creatures, searched by monsterstore.py. It is kept next to the compendium, so both list the
+# same monsters.
+storefile = os.path.join(os.path.dirname(outcompendium), STORE_NAME)
 
-    comp_monsters = comp["content"]["Monsters"]["data"]
+# Number of stat cards sent to a worker process at once in --jobs mode
+CARDS_PER_TASK = 25
+
+# Times the parsing helpers and the methods of the given backend in --profile mode
+def instrumentHelpers(backend):
+    PROFILER.instrument(ddbhelper, [ "ddbParseStatCard", "ddbParseNamedBlock", "ddbParseStatBlock", "ddbParseMetadata",
+                                     "ddbCreatureName", "ddbLink", "ddbImage", "replaceUnicode" ])
+    PROFILER.instrument(Ability, [ "__init__" ])
+    PROFILER.instrument(Creature, [ "fromDDBStatCard", "toFiveForge" ])
+    PROFILER.instrument(MonsterEncoder, [ "dumps" ])
+    PROFILER.instrument(type(backend), [ "parse", "parseCard" ])
+
+# Yields the creatures converted to the GM Forge format
+def convertCreatures(creatures):
     for creature in creatures:
-        comp_monsters.append(creature.toFiveForge())
+        with PROFILER.stage("fiveforge"):
+            monster = creature.toFiveForge()
+        yield monster
+
+# Reads the compendium the monsters are added to. If shard is set to one of the ShardBy values, the monsters are
+# added to a sharded compendium next to the output compendium instead, which starts without monsters.
+def loadCompendium(encoder=None, shard=None):
+    if shard:
+        folder = os.path.dirname(outcompendium)
+        LOG.info("Writing compendium shards by", shard, "to", folder)
+        return ShardedPack(folder, shard, encoder, os.path.splitext(os.path.basename(outcompendium))[0])
+
+    # Merge into the compendium written by the last run, so running the import again updates the monsters
+    # instead of adding them a second time
+    base = outcompendium if os.path.isfile(outcompendium) else incompendium
+    with PROFILER.stage("compendium load"):
+        index = PackIndex(base)
+        try:
+            pack = MonsterPack.load(base, encoder, index.layout())
+        finally:
+            index.close()
+
+    LOG.info("Read compendium", base)
+    return pack
+
+# Adds the monsters to the compendium. The monsters are written one at a time, so they can be given as a generator.
+# Monsters new to the compendium are written in the order of their names.
+# If a pack is given, the monsters are added to it, and it is kept open for further updates. Otherwise, the
+# compendium is read first, sharded if shard is set.
+def addToCompendium(monsters, encoder=None, pack=None, shard=None):
+    loaded = pack is None
+    if loaded:
+        pack = loadCompendium(encoder, shard)
+
+    try:
+        results = collections.Counter()
+        for monster in monsters:
+            with PROFILER.stage("compendium upsert"):
+                results[pack.upsert(monster)] += 1
+        pack.sortAdded()
+        LOG.info("\tAdded", results["added"], "monsters, updated", results["updated"], "and kept", results["unchanged"], "unchanged")
+        for result in [ "added", "updated", "unchanged" ]:
+            PROFILER.count("monsters " + result, results[result])
 
-    # Write modied compendium
-    with open(outcompendium, "w") as f:
-        json.dump(comp, f, indent=2)
+        # Write modied compendium
+        if isinstance(pack, ShardedPack):
+            with PROFILER.stage("compendium save"):
+                LOG.info("\tWrote", pack.save(), "of", len(pack), "shards")
+        elif pack.unsaved or not os.path.isfile(outcompendium):
+            with PROFILER.stage("compendium save"):
+                pack.save(outcompendium)
+                writeIndex(outcompendium, pack.layout)
+    finally:
+        if loaded:
+            pack.close()
 
     return
 
-def writeCreatures():
-    print "### Writing", len(creatures), "creatures..."
+# Writes every creature to its own JSON file in the output folder
+def writeCreatures(creatures):
+    LOG.info("### Writing", len(creatures), "creatures...")
     for c in creatures:
         outfile = os.path.join(outdir, c.filename()+".json")
-        print "\tWriting", c.name+"..."
-        json = c.json()
+        LOG.debug("\tWriting", c.name+"...")
         with open(outfile, "w") as fp:
-            fp.write(json)
+            fp.write(c.json())
 
     return
     
-def downloadImages():
-    print "### Downloading images..."
+# Yields [ url, output file ] of the images of the creatures
+def imageFiles(creatures):
     for c in creatures:
         if c.image:
-            outfile = os.path.join(outimagedir, c.filename()+".jpeg")
-            if not os.path.isfile(outfile):
-                print "\t"+"Downloading", outfile+"..."
-                os.system("wget "+c.image+" -O \""+outfile+"\" > /dev/null")
-    print "\tAll images downloaded"
+            yield [c.image, os.path.join(outimagedir, c.filename()+".jpeg")]
+
+# Downloads the images of the creatures. The creatures may be given as a generator, and their images are
+# downloaded while it produces them.
+def downloadImages(creatures, concurrency=8):
+    LOG.info("### Downloading images...")
+    if not os.path.exists(outimagedir):
+        os.makedirs(outimagedir)
+
+    downloader = Downloader(os.path.join(outimagedir, ".etags.json"), concurrency=concurrency)
+    with PROFILER.stage("images"):
+        results = downloader.download(imageFiles(creatures))
+
+    for status in [ DownloadStatus.DOWNLOADED, DownloadStatus.UNCHANGED, DownloadStatus.FAILED ]:
+        LOG.info("\t"+status.capitalize()+":", len([ s for s in results.values() if s == status ]))
+        PROFILER.count("images " + status, len([ s for s in results.values() if s == status ]))
+    LOG.info("\tAll images downloaded")
 
     return
 
-# Parse parameters to get input files
-infiles = []
-for i in range(1, len(sys.argv)):
-    infiles.append(sys.argv[i])
+# Adds the creatures to the monster store in a single transaction
+def storeCreatures(creatures):
+    with PROFILER.stage("store"):
+        store = MonsterStore(storefile)
+        try:
+            LOG.info("### Stored", store.putAll(creatures), "creatures in", storefile)
+        finally:
+            store.close()
+
+# Writes the creatures to the given creature file, which can be imported instead of the pages they were parsed from
+def saveCreatureFile(creatures, path):
+    with PROFILER.stage("creature file"):
+        LOG.info("### Saved", saveCreatures(path, creatures), "creatures in", path)
+
+# Yields the creatures of a creature file written by --save-creatures. If a source is given, it replaces the source
+# book of the creatures.
+def readCreatureFile(infile, source=None):
+    LOG.info("### Reading creature file", infile)
+    with PROFILER.stage("creature file"):
+        creatures = loadCreatures(infile)
+    LOG.info("\tCreatures:", len(creatures))
+    for c in creatures:
+        if source:
+            c.source = source
+        yield c
+
+# Yields [ DDBDocument, markup of the card ] for all stat cards of the given file, without building a tree
+# of the document. If a source is given, it replaces the source book taken from the title of the document.
+def splitFile(infile, source=None):
+    with open(infile, "rb") as fp:
+        for document, html in ddbStreamStatCards(readUnicodeChunks(fp)):
+            if source:
+                document.source = source
+            yield [document, html]
+
+# Parses the given stat cards. Runs in the worker processes of the --jobs mode, so it receives [ DDBDocument,
+# markup, file ] of the cards and returns plain creature records. Returns [ records, errors ], with a record for
+# each card, or None if the card cannot be parsed, and the errors of the cards that cannot be parsed.
+def parseCards(task):
+    backend, cards = task
+    backend = getBackend(backend)
+
+    records = []
+    for document, html, infile in cards:
+        ERRORS.file = infile
+        c = Creature.fromDDBStatCard(backend.parseCard(html), document)
+        records.append(c.toRecord() if c else None)
+
+    return [records, ERRORS.take()]
+
+# Returns the creature of the given stat card from the cache, or None if the card has not been parsed before
+def cachedCreature(cache, key, document):
+    record = cache.get(key) if cache else None
+    if not record:
+        return None
+
+    c = Creature.fromRecord(record)
+    c.source = document.source
+    return c
+
+# Parses all stat cards of the given files in a pool of worker processes.
+# The files are split into batches of cards, so the cards of a single large file are parsed in parallel as well.
+# Cards found in the cache are not sent to the workers. Yields the creatures in the order of their cards, as soon as
+# their batch is parsed.
+def parseFilesParallel(infiles, jobs, backend, cache=None, source=None):
+    creatures = []
+    pending = []    # [ index in creatures, cache key, DDBDocument, markup, file ] of each card that must be parsed
+    for infile in infiles:
+        LOG.info("### Splitting file", infile)
+        with PROFILER.stage("split"):
+            for document, html in splitFile(infile, source):
+                key = cache.key(html, document.url) if cache else None
+                creatures.append(cachedCreature(cache, key, document))
+                if not creatures[-1]:
+                    pending.append([len(creatures)-1, key, document, html, infile])
+    PROFILER.count("cards", len(creatures))
+
+    tasks = []
+    for i in range(0, len(pending), CARDS_PER_TASK):
+        tasks.append((backend.name, [ card[2:] for card in pending[i:i+CARDS_PER_TASK] ]))
+
+    LOG.info("### Parsing", len(pending), "of", len(creatures), "cards in", len(tasks), "batches with", jobs, "processes")
+    progress = Progress("\tParsed cards", len(pending))
+    pool = multiprocessing.Pool(jobs)
+
+    def parsed():
+        for batch, errors in pool.imap(parseCards, tasks, 1):
+            ERRORS.extend(errors)
+            progress.step(len(batch))
+            for record in batch:
+                yield record
+
+    # The cards not found in the cache are parsed in the order they are pending
+    records = parsed()
+    pending = iter(pending)
+    try:
+        for c in creatures:
+            if not c:
+                index, key, document, html, infile = next(pending)
+                record = next(records)
+                if not record:
+                    PROFILER.count("failed")
+                    continue
+                if cache:
+                    cache.put(key, record)
+                c = Creature.fromRecord(record)
+            yield c
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+    progress.done()
+
+# Parses all stat cards of the given file, one card at a time. Only the tree of the current card is built, so the
+# memory used does not grow with the size of the file. Cards found in the cache are not parsed again.
+# Yields the creatures.
+def streamFile(infile, backend, cache=None, source=None):
+    LOG.info("### Streaming file", infile)
+    ERRORS.file = infile
+    progress = Progress("\tCards")
+    for document, html in splitFile(infile, source):
+        PROFILER.count("cards")
+        progress.step()
+        key = cache.key(html, document.url) if cache else None
+        c = cachedCreature(cache, key, document)
+        if c:
+            yield c
+            continue
+
+        start = PROFILER.start()
+        with PROFILER.stage("tree"):
+            card = backend.parseCard(html)
+        c = Creature.fromDDBStatCard(card, document)
+        PROFILER.card(c.name if c else "(unparsed)", start)
+        if c:
+            if cache:
+                cache.put(key, c.toRecord())
+            yield c
+        else:
+            PROFILER.count("failed")
+    progress.done()
+
+# Parses all stat cards of the given files, one file after another. Yields the creatures.
+# If a source is given, it replaces the source book taken from the titles of the files.
+def parseFiles(infiles, backend, source=None):
+    for infile in infiles:
+        with open(infile) as fp:
+            with PROFILER.stage("tree"):
+                document, cards = backend.parse(fp.read())
+            if source:
+                document.source = source
+            PROFILER.count("cards", len(cards))
+
+            # Parse all stat cards
+            LOG.info("### Parsing file", infile)
+            ERRORS.file = infile
+            progress = Progress("\tCards", len(cards))
+            for card in cards:
+                start = PROFILER.start()
+                c = Creature.fromDDBStatCard(card, document)
+                PROFILER.card(c.name if c else "(unparsed)", start)
+                progress.step()
+                if c:
+                    yield c
+                else:
+                    PROFILER.count("failed")
+            progress.done()
+
+# Yields the creatures of all given files, parsed the way the arguments ask for. The creatures of creature files are
+# read after the ones of the pages, without parsing them again.
+def parseCreatures(args, infiles, backend, cache):
+    pages = [ infile for infile in infiles if not isCreatureFile(infile) ]
+    if not pages:
+        creatures = iter([])
+    elif args.jobs > 1:
+        creatures = parseFilesParallel(pages, args.jobs, backend, cache, args.source)
+    elif args.stream or cache:
+        creatures = ( c for infile in pages for c in streamFile(infile, backend, cache, args.source) )
+    else:
+        creatures = parseFiles(pages, backend, args.source)
+
+    try:
+        for c in creatures:
+            yield c
+    finally:
+        if hasattr(creatures, "close"):
+            creatures.close()
+
+    for infile in infiles:
+        if infile not in pages:
+            for c in readCreatureFile(infile, args.source):
+                yield c
+
+# Runs the import in phases: all creatures are parsed, then converted and written, then their images are downloaded
+def importPhased(args, infiles, backend, cache, encoder, pack=None):
+    with PROFILER.stage("parse"):
+        creatures = list(parseCreatures(args, infiles, backend, cache))
+
+    # Sort creature list
+    creatures = sorted(creatures, key=lambda creature : creature.name)
+
+    if args.save_creatures:
+        saveCreatureFile(creatures, args.save_creatures)
+
+    if not args.no_store:
+        storeCreatures(creatures)
+
+    # Write all found creatures
+    addToCompendium(convertCreatures(creatures), encoder, pack, args.shard)
+
+    downloadImages(creatures, args.image_jobs)
+
+# Runs the import as a pipeline: every creature is converted, written, stored and has its image downloaded while
+# the next cards are parsed. The stages are connected by bounded queues, so a slow stage holds back the parser,
+# instead of the creatures piling up in memory. The results are the same as the ones of importPhased().
+def importPipelined(args, infiles, backend, cache, encoder, pack=None):
+    pipeline = Pipeline(args.queue_size)
+
+    converted = pipeline.channel()
+    monsters = pipeline.transform("fiveforge", convertCreatures, converted)
+    pipeline.consume("compendium", lambda monsters: addToCompendium(monsters, encoder, pack, args.shard), monsters)
+
+    images = pipeline.channel()
+    pipeline.consume("images", lambda creatures: downloadImages(creatures, args.image_jobs), images)
+
+    outputs = [ converted, images ]
+    if not args.no_store:
+        stored = pipeline.channel()
+        pipeline.consume("store", storeCreatures, stored)
+        outputs.append(stored)
+    if args.save_creatures:
+        saved = pipeline.channel()
+        pipeline.consume("creatures", lambda creatures: saveCreatureFile(creatures, args.save_creatures), saved)
+        outputs.append(saved)
+
+    def produce():
+        creatures = parseCreatures(args, infiles, backend, cache)
+        try:
+            for creature in creatures:
+                for channel in outputs:
+                    if channel is not images or creature.image:
+                        channel.put(creature)
+        finally:
+            creatures.close()
+        for channel in outputs:
+            channel.close()
+
+    pipeline.run(produce)
+
+# Returns the input files of the given paths. Folders are replaced with the HTML and creature files they contain.
+def inputFiles(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted([ os.path.join(path, name) for name in os.listdir(path)
+                                  if os.path.splitext(name)[1].lower() in [ ".html", ".htm", EXTENSION ] ]))
+        else:
+            files.append(path)
+    return files
+
+# Returns what identifies the version of a file, or None if it does not exist
+def fileVersion(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+# Imports the given files into the pack in --watch mode. Returns the error that stopped the import, or None.
+def importChanged(args, infiles, backend, cache, encoder, pack):
+    try:
+        if args.phased:
+            importPhased(args, infiles, backend, cache, encoder, pack)
+        else:
+            importPipelined(args, infiles, backend, cache, encoder, pack)
+    except Exception as e:
+        LOG.debug(traceback.format_exc())
+        return e
+    return None
+
+# Imports the given files and the HTML files of the given folders whenever they change, until interrupted.
+# The compendium and the parser stay in memory between imports, and only the changed files are parsed again. A
+# file is imported once it has not changed for one interval, so files still being saved are not read. A file that
+# cannot be imported is reported and skipped until it changes again.
+def watch(args, backend, cache, encoder):
+    def failed(infiles, error):
+        LOG.error("### Unable to import", ", ".join(infiles) + ":", error)
+        ERRORS.file = ", ".join(infiles)
+        ERRORS.add(None, "Unable to import file", "%s: %s" % (type(error).__name__, error))
+
+    pack = loadCompendium(encoder, args.shard)
+    imported = {}   # Maps each file to the version imported last
+    changing = {}   # Maps each changed file to the version seen at the last poll
+    first = True
+    try:
+        while True:
+            changed = []
+            for infile in inputFiles(args.infiles):
+                version = fileVersion(infile)
+                if version is None or version == imported.get(infile):
+                    continue
+                if first or changing.get(infile) == version:
+                    changed.append(infile)
+                    imported[infile] = version
+                    changing.pop(infile, None)
+                else:
+                    changing[infile] = version
+            first = False
+
+            if changed:
+                LOG.info("### Importing", len(changed), "changed files")
+                start = time.time()
+                if cache:
+                    cache.now = start   # Cards used in this import are more recent than the ones of the last
+                error = importChanged(args, changed, backend, cache, encoder, pack)
+                if error and len(changed) > 1:
+                    # Import the files one at a time, so only the ones that fail are skipped
+                    ERRORS.take()
+                    for infile in changed:
+                        error = importChanged(args, [infile], backend, cache, encoder, pack)
+                        if error:
+                            failed([infile], error)
+                elif error:
+                    failed(changed, error)
+                if cache:
+                    cache.flush()
+                ERRORS.summary()
+                if args.error_report:
+                    ERRORS.write(args.error_report)
+                ERRORS.take()
+                LOG.info("### Imported in %.1f s, watching" % (time.time() - start), ", ".join(args.infiles))
+
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        LOG.info("### Stopped watching")
+    finally:
+        pack.close()
 
-if len(infiles) == 0:
-    print "No input files specified."
-    exit(1)
+if __name__ == "__main__":
+    # Parse parameters to get input files
+    parser = argparse.ArgumentParser(description="Imports creatures from D&D Beyond pages into a GM Forge compendium.")
+    parser.add_argument("infiles", nargs="*",
+                        help="HTML files saved from D&D Beyond, creature files written by --save-creatures, or folders containing them")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used for parsing")
+    parser.add_argument("--backend", choices=availableBackends(), default=None,
+                        help="HTML parser used to build the page tree (default: the fastest installed one)")
+    parser.add_argument("--source", default=None,
+                        help="name of the source book of all input files, for pages whose title does not contain it")
+    parser.add_argument("--stream", action="store_true",
+                        help="only build the tree of one stat card at a time, instead of the whole page")
+    parser.add_argument("--no-cache", action="store_true", help="parse all stat cards, without using the card cache")
+    parser.add_argument("--rebuild-cache", action="store_true", help="clear the card cache before parsing")
+    parser.add_argument("--cache-size", type=int, default=256, help="maximum size of the card cache in MB")
+    parser.add_argument("--save-creatures", default=None, metavar="FILE",
+                        help="also write the parsed creatures to a compact creature file, which can be imported instead of the pages")
+    parser.add_argument("--no-store", action="store_true", help="do not add the creatures to the monster store")
+    parser.add_argument("--phased", action="store_true",
+                        help="parse all creatures before writing them and downloading their images, instead of "
+                             "running all stages at the same time")
+    parser.add_argument("--queue-size", type=int, default=64, help="number of creatures waiting between two stages")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running, and import the input files again whenever they change")
+    parser.add_argument("--interval", type=float, default=2.0, help="time between two checks for changes in --watch mode in seconds")
+    parser.add_argument("--image-jobs", type=int, default=8, help="number of images downloaded at the same time")
+    parser.add_argument("--shard", choices=[ ShardBy.SOURCE, ShardBy.INITIAL ], default=None,
+                        help="write the monsters to one pack per source book or initial, and a manifest listing "
+                             "the packs, instead of a single compendium")
+    parser.add_argument("--compact", action="store_true", help="write new monsters without indentation")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every creature and ability parsed")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    parser.add_argument("--error-report", default=None, help="file the cards that could not be parsed are written to as JSON")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every stage of the import and report the slowest cards (not inside --jobs workers)")
+    parser.add_argument("--profile-output", default=None,
+                        help="profile the import with cProfile as well, and write the statistics to this file")
+    parser.add_argument("--slowest", type=int, default=10, help="number of slowest cards reported by --profile")
+    parser.add_argument("--fast-json", action="store_true",
+                        help="serialize monsters with simplejson" + ("" if MonsterEncoder.available() else " (not installed)"))
+    args = parser.parse_args()
 
+    if args.verbose:
+        LOG.level = LogLevel.DEBUG
+    elif args.quiet:
+        LOG.level = LogLevel.WARNING
 
-creatures = []
+    infiles = args.infiles
+    if len(infiles) == 0:
+        LOG.error("No input files specified.")
+        exit(1)
+    if args.watch and args.save_creatures:
+        LOG.error("--save-creatures cannot be used in --watch mode.")
+        exit(1)
 
-for infile in infiles:
-    with open(infile) as fp:
-        soup = BeautifulSoup(fp, "html.parser")
+    backend = getBackend(args.backend)
+    LOG.info("### Using HTML backend", backend.name)
 
-        # Parse all stat cards
-        print "### Parsing file", infile
-        for card in soup.select('div[class*=\"Basic-Text-Frame\"]'):
-            c = Creature.fromDDBStatCard(card)
-            if c:
-                creatures.append(c)
-            else:
-                print "Unable to parse creature!"
+    if args.profile or args.profile_output:
+        PROFILER.enable(args.slowest, args.profile_output is not None)
+        instrumentHelpers(backend)
 
-        # Create output folder
-        if not os.path.exists(outdir):
-            print "Creating output folder", outdir
-            os.makedirs(outdir)
+    # The cache is keyed by the markup of the cards, so it is only used when the cards are split from the raw markup
+    cache = None
+    if not args.no_cache:
+        cache = ParseCache(cachefile, args.cache_size*1024*1024)
+        if args.rebuild_cache:
+            cache.clear()
 
-# Sort creature list
-creatures = sorted(creatures, key=lambda creature : creature.name)
+    # Create output folder
+    if not os.path.exists(outdir):
+        LOG.info("Creating output folder", outdir)
+        os.makedirs(outdir)
 
-# Write all found creatures
-addToCompendium(creatures)
+    encoder = MonsterEncoder(None if args.compact else 2, args.fast_json)
+    try:
+        if args.watch:
+            watch(args, backend, cache, encoder)
+        elif args.phased:
+            importPhased(args, inputFiles(infiles), backend, cache, encoder)
+        else:
+            importPipelined(args, inputFiles(infiles), backend, cache, encoder)
+    finally:
+        if cache:
+            LOG.info("### Took", cache.hits, "cards from the cache, parsed", cache.misses)
+            PROFILER.count("cache hits", cache.hits)
+            PROFILER.count("cache misses", cache.misses)
+            with PROFILER.stage("cache close"):
+                cache.close()
 
-downloadImages()
+    if not args.watch:
+        ERRORS.summary()
+        if args.error_report:
+            ERRORS.write(args.error_report)
 
+    PROFILER.report(args.profile_output)
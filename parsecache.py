@@ -0,0 +1,83 @@
+import os
+import time
+import sqlite3
+import hashlib
+import cPickle as pickle
+
+from creature import PARSER_VERSION
+
+# On-disk cache of parsed stat cards.
+# Maps a hash of the markup of a stat card, the URL of its page and the parser version to the record of the parsed
+# creature, so unchanged cards never have to be parsed again. The URL is part of the key, as the links of the
+# creature are resolved against it. Once the cache grows beyond its maximum size, the least recently
+# used cards are evicted.
+class ParseCache(object):
+    def __init__(self, path, max_size=256*1024*1024):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.max_size = max_size
+        self.now = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS cards (key TEXT PRIMARY KEY, record BLOB NOT NULL, "
+                        "size INTEGER NOT NULL, used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS cards_used ON cards (used)")
+
+    # Returns the key of the given stat card markup, found on the page with the given canonical URL
+    @staticmethod
+    def key(html, url=None):
+        if isinstance(html, unicode):
+            html = html.encode("utf-8")
+        if isinstance(url, unicode):
+            url = url.encode("utf-8")
+        h = hashlib.sha1(str(PARSER_VERSION) + "\n" + (url or "") + "\n")
+        h.update(html)
+        return h.hexdigest()
+
+    # Returns the creature record stored for the given key, or None if the card has not been parsed before
+    def get(self, key):
+        row = self.db.execute("SELECT record FROM cards WHERE key = ?", (key,)).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.db.execute("UPDATE cards SET used = ? WHERE key = ?", (self.now, key))
+        return pickle.loads(str(row[0]))
+
+    # Stores the creature record for the given key
+    def put(self, key, record):
+        data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        self.db.execute("INSERT OR REPLACE INTO cards (key, record, size, used) VALUES (?, ?, ?, ?)",
+                        (key, sqlite3.Binary(data), len(data), self.now))
+
+    # Removes all cards from the cache
+    def clear(self):
+        self.db.execute("DELETE FROM cards")
+
+    # Removes the least recently used cards, until the cache is no larger than its maximum size
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cards").fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        evicted = []
+        for key, size in self.db.execute("SELECT key, size FROM cards ORDER BY used").fetchall():
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM cards WHERE key = ?", evicted)
+
+    # Evicts old cards and writes all changes to disk
+    def flush(self):
+        self.evict()
+        self.db.commit()
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,124 @@
+import sys
+import Queue
+import threading
+
+from profiling import PROFILER
+
+# Marks the end of the items of a channel
+END = object()
+
+# Raised in the stages of a pipeline, once it has been cancelled
+class Cancelled(Exception):
+    pass
+
+# A bounded queue between two stages of a pipeline.
+# put() blocks while the queue is full, so a slow stage holds back the stages feeding it, instead of letting the
+# items pile up in memory. Iterating over the channel yields its items until it is closed. Both raise Cancelled
+# once the pipeline is cancelled, so no stage waits forever for a stage that stopped.
+class Channel(object):
+    def __init__(self, pipeline, size):
+        self.pipeline = pipeline
+        self.queue = Queue.Queue(size)
+
+    def put(self, item):
+        while True:
+            if self.pipeline.cancelled.is_set():
+                raise Cancelled()
+            try:
+                self.queue.put(item, timeout=Pipeline.POLL)
+                return
+            except Queue.Full:
+                pass
+
+    # Ends the items of the channel
+    def close(self):
+        self.put(END)
+
+    def __iter__(self):
+        while True:
+            if self.pipeline.cancelled.is_set():
+                raise Cancelled()
+            try:
+                item = self.queue.get(timeout=Pipeline.POLL)
+            except Queue.Empty:
+                continue
+            if item is END:
+                return
+            yield item
+
+# Runs the stages of a job in threads connected by channels, so every stage works while the others do.
+# If a stage fails, the pipeline is cancelled, all other stages stop at their next put or get, and join() raises
+# the error of the failed stage.
+class Pipeline(object):
+    # Time between two checks for cancellation of a blocked put or get, in seconds
+    POLL = 0.1
+
+    def __init__(self, size=64):
+        self.size = size
+        self.cancelled = threading.Event()
+        self.threads = []
+        self.error = None
+        self.lock = threading.Lock()
+
+    # Returns a new channel between two stages, holding at most size items
+    def channel(self, size=None):
+        return Channel(self, size or self.size)
+
+    # Runs function(*args) in a new thread
+    def spawn(self, name, function, *args):
+        def run():
+            try:
+                function(*args)
+            except Cancelled:
+                pass
+            except BaseException:
+                with self.lock:
+                    if self.error is None:
+                        self.error = sys.exc_info()
+                self.cancel()
+
+        thread = threading.Thread(target=PROFILER.profiled(run), name=name)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+
+    # Runs a stage that passes every item of the input channel through function, which takes and returns an
+    # iterable. Returns the output channel of the stage.
+    def transform(self, name, function, channel):
+        output = self.channel()
+        def run():
+            for item in function(channel):
+                output.put(item)
+            output.close()
+        self.spawn(name, run)
+        return output
+
+    # Runs a stage that consumes all items of the input channel with function, which takes an iterable
+    def consume(self, name, function, channel):
+        self.spawn(name, function, channel)
+
+    # Stops all stages
+    def cancel(self):
+        self.cancelled.set()
+
+    # Runs function in the calling thread, which feeds the first channels of the pipeline, and waits for all
+    # stages to finish. Raises the error of a failed stage, or the one of the function, after cancelling the
+    # other stages.
+    def run(self, function):
+        try:
+            function()
+        except Cancelled:
+            pass
+        except BaseException:
+            self.cancel()
+            self.join()
+            raise
+        self.join()
+        if self.error:
+            raise self.error[0], self.error[1], self.error[2]
+
+    # Waits for all stages to finish. Joins with a timeout, so the main thread can still be interrupted.
+    def join(self):
+        for thread in self.threads:
+            while thread.is_alive():
+                thread.join(Pipeline.POLL)
@@ -0,0 +1,181 @@
+import sys
+import time
+import heapq
+import inspect
+import cProfile
+import pstats
+import functools
+import threading
+import collections
+
+# Measures a stage of the pipeline as a context manager
+class StageTimer(object):
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.profiler.add(self.name, time.time() - self.start)
+        return False
+
+# Stands in for StageTimer while profiling is disabled
+class NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+NULL_TIMER = NullTimer()
+
+# Timers and counters of the import pipeline.
+# Stages are timed with "with PROFILER.stage(name):", and functions are timed by wrapping them with instrument().
+# While profiling is disabled, stage() returns a shared object that does nothing, and no function is wrapped, so
+# the pipeline runs at full speed.
+class Profiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.times = collections.OrderedDict() # Maps each timer to [ calls, total time ]
+        self.counters = collections.OrderedDict()
+        self.slowest = 0
+        self.cards = []     # Heap of [ time, name ] of the slowest cards
+        self.profile = None
+        self.profiles = []  # cProfile profiles of the other threads
+        self.lock = threading.Lock()   # Stages may run in several threads
+
+    # Starts profiling. Keeps the given number of slowest cards. If profile is set, the whole run is also
+    # profiled with cProfile. cProfile only sees the thread it was enabled in, so threads started by the import
+    # must run their function through profiled() to be included.
+    def enable(self, slowest=10, profile=False):
+        self.enabled = True
+        self.slowest = slowest
+        if profile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    # Returns a function that runs the given function with a cProfile profile of the calling thread, which is merged
+    # into the report. Returns the function itself if the run is not profiled with cProfile.
+    def profiled(self, function):
+        if not self.profile:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self.lock:
+                    self.profiles.append(profile)
+        return wrapper
+
+    # Returns a context manager that times the given stage
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, name)
+
+    # Adds a call of the given duration to a timer
+    def add(self, name, elapsed):
+        with self.lock:
+            timer = self.times.get(name)
+            if timer is None:
+                timer = self.times[name] = [0, 0.0]
+            timer[0] += 1
+            timer[1] += elapsed
+
+    # Adds n to the given counter
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    # Returns the start time of a card, or None if profiling is disabled
+    def start(self):
+        return time.time() if self.enabled else None
+
+    # Records the time since start for the card of the given name
+    def card(self, name, start):
+        if start is None or self.slowest <= 0:
+            return
+        entry = [time.time() - start, name]
+        if len(self.cards) < self.slowest:
+            heapq.heappush(self.cards, entry)
+        elif entry[0] > self.cards[0][0]:
+            heapq.heapreplace(self.cards, entry)
+
+    # Returns a wrapper of the function that times every call
+    def timed(self, name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(name, time.time() - start)
+        return wrapper
+
+    # Times every call of the given functions of a module or methods of a class. Functions of a module are
+    # replaced in every module that imported them. Does nothing while profiling is disabled.
+    def instrument(self, owner, names):
+        if not self.enabled:
+            return
+
+        for name in names:
+            if inspect.isclass(owner):
+                label = owner.__name__ + "." + name
+                original = next(cls.__dict__[name] for cls in inspect.getmro(owner) if name in cls.__dict__)
+                if isinstance(original, staticmethod):
+                    setattr(owner, name, staticmethod(self.timed(label, original.__func__)))
+                else:
+                    setattr(owner, name, self.timed(label, original))
+            else:
+                label = owner.__name__ + "." + name
+                original = getattr(owner, name)
+                wrapper = self.timed(label, original)
+                for module in sys.modules.values():
+                    if module is not None and getattr(module, name, None) is original:
+                        setattr(module, name, wrapper)
+
+    # Prints all timers and counters, and the slowest cards. If a file is given, the cProfile statistics are
+    # written to it.
+    def report(self, statsfile=None):
+        if not self.enabled:
+            return
+
+        if self.profile:
+            self.profile.disable()
+
+        print "### Profile"
+        print "\t%-40s %8s %10s %10s" % ("Stage", "Calls", "Total [s]", "Mean [ms]")
+        for name, [calls, total] in sorted(self.times.items(), key=lambda item: -item[1][1]):
+            print "\t%-40s %8d %10.3f %10.3f" % (name, calls, total, total / calls * 1000)
+
+        if self.counters:
+            print "\tCounters:"
+            for name, value in self.counters.items():
+                print "\t\t%-32s %8d" % (name, value)
+
+        if self.cards:
+            print "\tSlowest cards:"
+            for elapsed, name in sorted(self.cards, reverse=True):
+                print "\t\t%8.3f ms  %s" % (elapsed * 1000, name)
+
+        if self.profile:
+            stats = pstats.Stats(self.profile, stream=sys.stdout)
+            with self.lock:
+                for profile in self.profiles:
+                    stats.add(profile)
+            if statsfile:
+                stats.dump_stats(statsfile)
+                print "\tWrote cProfile statistics to", statsfile
+            stats.sort_stats("cumulative").print_stats(25)
+
+# Profiler of the running import
+PROFILER = Profiler()
@@ -0,0 +1,84 @@
+#!/bin/python2
+
+# Tests of the creature files written by parse.py --save-creatures: files written and read back keep the creatures,
+# and truncated or invalid files are rejected with a ValueError.
+#
+# Usage: python2 -m unittest discover tests
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from creature import Creature
+from creaturefile import MAGIC, VERSION, FORMAT_VERSION, CreatureReader, loadCreatures, saveCreatures
+from htmlbackend import getBackend
+from log import LOG, LogLevel
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+class CreatureFileTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        LOG.level = LogLevel.WARNING
+        with open(os.path.join(FIXTURES, "fiveforge.html")) as fp:
+            document, cards = getBackend().parse(fp.read())
+        cls.creatures = [ Creature.fromDDBStatCard(card, document) for card in cards ]
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "monsters.creatures")
+        saveCreatures(self.path, self.creatures)
+        with open(self.path, "rb") as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertInvalid(self, data, message):
+        try:
+            list(CreatureReader(data))
+        except ValueError as e:
+            self.assertTrue(message in str(e), "unexpected error: %s" % e)
+        else:
+            self.fail("%d bytes read without error" % len(data))
+
+    # Offset of the end of the header, which is the start of the first creature
+    def headerSize(self):
+        reader = CreatureReader(self.data)
+        return reader.pos
+
+    def testRoundTrip(self):
+        creatures = loadCreatures(self.path)
+        self.assertEqual([ c.toRecord() for c in creatures ], [ c.toRecord() for c in self.creatures ])
+
+    # Files cut short in the magic, the version or the field names of the header
+    def testTruncatedHeader(self):
+        self.assertInvalid("", "Not a creature file")
+        self.assertInvalid(MAGIC[:2], "Not a creature file")
+        for end in range(len(MAGIC), self.headerSize()):
+            self.assertInvalid(self.data[:end], "truncated")
+
+    # Files cut short anywhere in the creatures, including within the strings of the string table and before the end
+    def testTruncatedCreatures(self):
+        for end in range(self.headerSize(), len(self.data)):
+            self.assertInvalid(self.data[:end], "truncated")
+
+    # A string that claims to be longer than the rest of the file
+    def testTruncatedString(self):
+        start = self.data.index("Shadow Knight 0")
+        self.assertInvalid(self.data[:start + 5], "truncated")
+
+    def testMagic(self):
+        self.assertInvalid("XXXX" + self.data[len(MAGIC):], "Not a creature file")
+
+    def testVersion(self):
+        for version in [ 0, FORMAT_VERSION + 1 ]:
+            data = MAGIC + VERSION.pack(version) + self.data[len(MAGIC) + VERSION.size:]
+            self.assertInvalid(data, "version %d" % version)
+
+if __name__ == "__main__":
+    unittest.main()
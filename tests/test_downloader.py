@@ -0,0 +1,160 @@
+#!/bin/python2
+
+# Tests of the downloader against a local HTTP server: conditional requests with ETags, retries, redirects and the
+# atomic writes of the downloaded files.
+#
+# Usage: python2 -m unittest discover tests
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import BaseHTTPServer
+import SocketServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from downloader import Downloader, DownloadStatus
+from log import LOG, LogLevel
+
+PAGE = "<html><body>Aboleth</body></html>"
+ETAG = '"aboleth-1"'
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+# Serves the test pages. The paths are:
+#   /page       the page with an ETag, or 304 if the request has the ETag
+#   /flaky      503 for the first two requests, then the page
+#   /redirect   a redirect to /page
+#   /broken     a response that is shorter than its Content-Length
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append([ self.path, self.headers.get("If-None-Match") ])
+            count = len([ request for request in server.requests if request[0] == self.path ])
+
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send(304)
+            else:
+                self.send(200, PAGE, { "ETag" : ETAG })
+        elif self.path == "/flaky":
+            if count <= 2:
+                self.send(503, "Busy")
+            else:
+                self.send(200, PAGE)
+        elif self.path == "/redirect":
+            self.send(302, "", { "Location" : "/page" })
+        elif self.path == "/broken":
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PAGE) * 2))
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(PAGE)
+            self.close_connection = 1
+        else:
+            self.send(404, "Not found")
+
+    def send(self, status, body="", headers={}):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class DownloaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        LOG.level = LogLevel.ERROR
+        cls.server = Server(("127.0.0.1", 0), Handler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.base = "http://127.0.0.1:%d" % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.folder = tempfile.mkdtemp()
+        self.etagfile = os.path.join(self.folder, "etags.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def downloader(self):
+        return Downloader(self.etagfile, concurrency=2, retries=3, backoff=0.01, timeout=5)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    # Files left next to the downloads, like temporary files of failed writes
+    def leftovers(self, *expected):
+        return sorted(set(os.listdir(self.folder)) - set(expected) - set([ "etags.json" ]))
+
+    # A downloaded file is only requested again with its ETag, and kept if the server answers 304
+    def testETag(self):
+        results = self.downloader().download([ [ self.base + "/page", self.path("page.html") ] ])
+        self.assertEqual(results, { self.path("page.html") : DownloadStatus.DOWNLOADED })
+        self.assertEqual(self.read("page.html"), PAGE)
+
+        results = self.downloader().download([ [ self.base + "/page", self.path("page.html") ] ])
+        self.assertEqual(results, { self.path("page.html") : DownloadStatus.UNCHANGED })
+        self.assertEqual(self.server.requests, [ [ "/page", None ], [ "/page", ETAG ] ])
+        self.assertEqual(self.read("page.html"), PAGE)
+
+    # Requests answered with 503 are retried until they succeed
+    def testRetry(self):
+        results = self.downloader().download([ [ self.base + "/flaky", self.path("flaky.html") ] ])
+        self.assertEqual(results, { self.path("flaky.html") : DownloadStatus.DOWNLOADED })
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.read("flaky.html"), PAGE)
+
+    def testRedirect(self):
+        results = self.downloader().download([ [ self.base + "/redirect", self.path("redirect.html") ] ])
+        self.assertEqual(results, { self.path("redirect.html") : DownloadStatus.DOWNLOADED })
+        self.assertEqual([ request[0] for request in self.server.requests ], [ "/redirect", "/page" ])
+        self.assertEqual(self.read("redirect.html"), PAGE)
+
+    # A failed request neither leaves a partial file nor replaces the file downloaded before
+    def testFailedWrite(self):
+        results = self.downloader().download([ [ self.base + "/broken", self.path("broken.html") ] ])
+        self.assertEqual(results, { self.path("broken.html") : DownloadStatus.FAILED })
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(self.leftovers(), [])
+
+        with open(self.path("old.html"), "w") as f:
+            f.write("old")
+        results = self.downloader().download([ [ self.base + "/broken", self.path("old.html") ] ])
+        self.assertEqual(results, { self.path("old.html") : DownloadStatus.FAILED })
+        self.assertEqual(self.read("old.html"), "old")
+        self.assertEqual(self.leftovers("old.html"), [])
+
+    def testNotFound(self):
+        results = self.downloader().download([ [ self.base + "/missing", self.path("missing.html") ] ])
+        self.assertEqual(results, { self.path("missing.html") : DownloadStatus.FAILED })
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.leftovers(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/bin/python2
+
+# Golden-output test of Creature.toFiveForge.
+# fixtures/fiveforge.json holds the monsters of fixtures/fiveforge.html as the serializer wrote them before it was
+# rewritten to build on shared constant blocks, dumped with indent=2 like the entries of a compendium pack. The
+# current serializer must produce the same bytes.
+#
+# Usage: python2 -m unittest discover tests
+
+import os
+import sys
+import json
+import unittest
+import collections
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+from compendium import MonsterEncoder
+from creature import Creature
+from htmlbackend import availableBackends, getBackend
+from log import LOG, LogLevel
+
+# Returns the creatures of the fixture page, parsed with the given backend
+def fixtureCreatures(backend):
+    with open(os.path.join(FIXTURES, "fiveforge.html")) as fp:
+        document, cards = backend.parse(fp.read())
+    return [ Creature.fromDDBStatCard(card, document) for card in cards ]
+
+class FiveForgeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        LOG.level = LogLevel.WARNING
+        with open(os.path.join(FIXTURES, "fiveforge.json")) as fp:
+            cls.expected = fp.read()
+
+    def testGoldenOutput(self):
+        for name in availableBackends():
+            monsters = [ c.toFiveForge() for c in fixtureCreatures(getBackend(name)) ]
+            self.assertEqual(len(monsters), 6)
+            self.assertEqual(json.dumps(monsters, indent=2), self.expected, "output differs with backend " + name)
+
+    # The shared blocks must not be modified by the serialization of one creature
+    def testRepeatedOutput(self):
+        creatures = fixtureCreatures(getBackend())
+        first = [ json.dumps(c.toFiveForge(), indent=2) for c in creatures ]
+        second = [ json.dumps(c.toFiveForge(), indent=2) for c in reversed(creatures) ]
+        self.assertEqual(first, list(reversed(second)))
+
+    # Entries written to a pack by the encoder, with or without the fast backend, are the same as well
+    def testEncoder(self):
+        expected = json.loads(self.expected, object_pairs_hook=collections.OrderedDict)
+        monsters = [ c.toFiveForge() for c in fixtureCreatures(getBackend()) ]
+        for fast in [ False, True ]:
+            encoder = MonsterEncoder(2, fast)
+            for monster, entry in zip(monsters, expected):
+                self.assertEqual(encoder.dumps(monster), json.dumps(entry, indent=2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/bin/python2
+
+# Tests of the timers, counters and cProfile statistics of the profiler when stages run in several threads.
+#
+# Usage: python2 -m unittest discover tests
+
+import os
+import sys
+import pstats
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from profiling import Profiler
+from pipeline import Pipeline
+import pipeline
+
+def stageFunction(n):
+    return sum(range(n))
+
+class ProfilerTest(unittest.TestCase):
+    # Timers and counters updated by many threads at once lose no update
+    def testThreads(self):
+        profiler = Profiler()
+        profiler.enable(0)
+
+        def work():
+            for i in range(2000):
+                profiler.add("stage", 0.001)
+                profiler.count("cards")
+        threads = [ threading.Thread(target=work) for i in range(8) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(profiler.times["stage"][0], 16000)
+        self.assertAlmostEqual(profiler.times["stage"][1], 16.0)
+        self.assertEqual(profiler.counters["cards"], 16000)
+
+    # Functions run in the stages of a pipeline appear in the cProfile statistics
+    def testPipelineProfile(self):
+        expected = [ stageFunction(n) for n in range(10) ]
+        profiler = Profiler()
+        profiler.enable(0, True)
+        original = pipeline.PROFILER
+        pipeline.PROFILER = profiler
+        try:
+            p = Pipeline(4)
+            channel = p.channel()
+            results = []
+            p.consume("stage", lambda items: results.extend([ stageFunction(n) for n in items ]), channel)
+
+            def produce():
+                for n in range(10):
+                    channel.put(n)
+                channel.close()
+            p.run(produce)
+        finally:
+            pipeline.PROFILER = original
+
+        self.assertEqual(results, expected)
+        fd, statsfile = tempfile.mkstemp()
+        os.close(fd)
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            profiler.report(statsfile)
+            stats = pstats.Stats(statsfile)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.remove(statsfile)
+
+        calls = [ stat[0] for (filename, line, name), stat in stats.stats.items() if name == "stageFunction" ]
+        self.assertEqual(calls, [ 10 ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/bin/python2
+# -*- coding: utf-8 -*-
+
+# Regression test of the stat card walker.
+# fixtures/statcard.html holds a single card with the cases the walker has to tell apart: special abilities with
+# nested markup in their names and descriptions, actions whose description continues over several paragraphs, a
+# paragraph after the actions that belongs to no section, continued reactions and legendary actions. The expected
+# sections are those the ddbParse* helpers returned before they were merged into a single walk.
+#
+# Usage: python2 -m unittest discover tests
+
+import os
+import sys
+import copy
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ddbhelper import DDBSections, ddbParseStatCard, ddbTextWithout, DDB_SUBHEAD_CLASS
+from htmlbackend import availableBackends, getBackend
+from log import LOG, LogLevel
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+EXPECTED = {
+    DDBSections.SPECIAL_ABILITIES : [
+        [ u"Antimagic Cone.", u"The beholder's central eye creates an area of antimagic, as in the antimagic field "
+                              u"spell, in a 150-foot cone." ],
+    ],
+    DDBSections.ACTIONS : [
+        [ u"Bite.", u"Melee Weapon Attack: +5 to hit, reach 5 ft., one target. Hit: 14 (4d6) piercing damage." ],
+        [ u"Eye Rays.", u"The beholder shoots three of the following magical eye rays at random.\n"
+                        u"1. Charm Ray. The targeted creature must succeed on a DC 16 Wisdom saving throw.\n"
+                        u"2. Paralyzing Ray. The targeted creature must succeed on a DC 16 Constitution saving throw." ],
+    ],
+    DDBSections.LEGENDARY_ACTIONS : [
+        [ u"Eye Ray.", u"The beholder uses one random eye ray." ],
+        [ u"Tail Swipe.", u"The beholder rolls  over." ],
+    ],
+    DDBSections.REACTIONS : [
+        [ u"Spell Reflection.", u"If the beholder makes a successful saving throw against a spell, it can reflect "
+                                u"the spell.\nThe reflected spell targets another creature." ],
+    ],
+    DDBSections.ABILITIES : { u"STR" : u"10", u"DEX" : u"14" },
+    DDBSections.STATS : {
+        u"Armor Class"  : u"18 (natural armor)",
+        u"Hit Points"   : u"180 (19d10 + 76)",
+        u"Speed"        : u"0 ft., fly 20 ft. (hover)",
+        u"Challenge"    : u"13 (10,000 XP)",
+        u"Size"         : u"Large",
+        u"Type"         : u"aberration",
+        u"Subtype"      : u"",
+        u"Alignment"    : u"lawful evil",
+    },
+}
+
+# Returns the stat card of the fixture page, parsed with the given backend
+def fixtureCard(backend):
+    with open(os.path.join(FIXTURES, "statcard.html")) as fp:
+        document, cards = backend.parse(fp.read())
+    return cards[0]
+
+class StatCardTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        LOG.level = LogLevel.WARNING
+
+    def testSections(self):
+        for name in availableBackends():
+            sections = ddbParseStatCard(fixtureCard(getBackend(name)))
+            for section, expected in EXPECTED.items():
+                self.assertEqual(sections[section], expected, "%s differs with backend %s" % (section, name))
+
+    # The text without a descendant is the text of a copy of the tag the descendant was extracted from, and the
+    # tag itself is left as it was
+    def testTextWithout(self):
+        card = fixtureCard(getBackend())
+        before = unicode(card)
+        blocks = [ block for block in card.find_all("p") if block.find("span") ]
+        self.assertTrue(blocks)
+        for block in blocks:
+            span = block.find("span")
+            expected = copy.copy(block)
+            expected.find("span").extract()
+            self.assertEqual(ddbTextWithout(block, span), expected.get_text())
+        self.assertEqual(unicode(card), before)
+
+    # Nested tags in the name tag are kept out of the text as well
+    def testNestedName(self):
+        card = fixtureCard(getBackend())
+        block = card.find("span", DDB_SUBHEAD_CLASS).parent
+        self.assertEqual(ddbTextWithout(block, block.find("span", DDB_SUBHEAD_CLASS)),
+                         u" The beholder’s central eye creates an area of antimagic, as in the antimagic field "
+                         u"spell, in a 150-foot cone.")
+
+if __name__ == "__main__":
+    unittest.main()